@@ -0,0 +1,52 @@
+# -*- coding:utf-8 -*-
+import random
+
+
+def make_repository(i, rand):
+    return {
+        "id": i,
+        "full_name": "user{}/repo{}".format(i % 97, i),
+        "html_url": "https://github.com/user{}/repo{}".format(i % 97, i),
+        "description": "description {}".format(i),
+        "stargazers_count": rand.randint(0, 10000),
+        "owner": {
+            "login": "user{}".format(i % 97),
+            "id": i % 97,
+            "html_url": "https://github.com/user{}".format(i % 97),
+            "type": "User",
+            "site_admin": False,
+            "links": {"self": {"href": "https://api.github.com/users/user{}".format(i % 97)}},
+        },
+        "topics": ["topic{}".format(j) for j in range(i % 5)],
+        "packages": [
+            {"name": "pkg{}-{}".format(i, j), "version": "1.{}".format(j), "downloads": rand.randint(0, 1000)}
+            for j in range(5)
+        ],
+    }
+
+
+def make_repositories(n, seed=0):
+    rand = random.Random(seed)
+    return [make_repository(i, rand) for i in range(n)]
+
+
+def make_tree(depth, width, i=0):
+    node = {"id": i, "name": "node{}".format(i), "secret": "xxx", "children": []}
+    if depth > 0:
+        node["children"] = [make_tree(depth - 1, width, i * width + j + 1) for j in range(width)]
+    return node
+
+
+def make_authors(n, nbooks=10, seed=0):
+    rand = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "name": "author{}".format(i),
+            "books": [
+                {"id": j, "title": "book{}-{}".format(i, j), "pages": rand.randint(10, 1000), "author": {"id": i, "name": "author{}".format(i)}}
+                for j in range(nbooks)
+            ],
+        }
+        for i in range(n)
+    ]
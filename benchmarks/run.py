@@ -0,0 +1,147 @@
+# -*- coding:utf-8 -*-
+"""
+python benchmarks/run.py                       # run all benchmarks
+python benchmarks/run.py -k nested -n 2000     # only matched benchmarks, with 2000 records
+python benchmarks/run.py --json after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, here)
+
+from dictremapper import Remapper, Path, Composed, Aggregate, LazyMapperCallable, Self  # NOQA
+import datagen  # NOQA
+
+
+class FlatMapper(Remapper):
+    id = Path("id")
+    name = Path("full_name")
+    url = Path("html_url")
+    description = Path("description")
+    star = Path("stargazers_count", default=0, callback=int)
+
+
+class DeepMapper(Remapper):
+    login = Path("owner.login")
+    owner_id = Path("owner.id")
+    owner_url = Path("owner.html_url")
+    owner_type = Path("owner.type")
+    site_admin = Path("owner.site_admin")
+    href = Path("owner.links.self.href")
+
+
+class FanoutMapper(Remapper):
+    names = Path("packages[].name")
+    versions = Path("packages[].version")
+    downloads = Path("packages[].downloads")
+
+
+class PackageMapper(Remapper):
+    name = Path("name")
+    version = Path("version")
+    downloads = Path("downloads")
+
+
+class NestedMapper(Remapper):
+    name = Path("full_name")
+    packages = Path("packages", callback=PackageMapper(many=True))
+
+
+class ComposedMapper(Remapper):
+    name = Path("full_name")
+    fullname = Composed([Path("owner.login"), Path("full_name")], callback=lambda x, y: "{}@{}".format(x, y))
+    packages = Path("packages[].downloads", tmpstate=True)
+    total = Aggregate(lambda d: sum(d["packages"]))
+
+
+class TreeMapper(Remapper):
+    id = Path("id")
+    name = Path("name")
+    secret = Path("secret")
+    children = Path("children", callback=Self(many=True))
+
+
+class AuthorMapper(Remapper):
+    name = Path("name")
+    books = Path("books", callback=LazyMapperCallable(__name__ + ".BookMapper", many=True, excludes=("author.books", )))
+
+
+class BookMapper(Remapper):
+    title = Path("title")
+    pages = Path("pages")
+    author = Path("author", callback=LazyMapperCallable(__name__ + ".AuthorMapper", excludes=("books", )))
+
+
+def make_benchmarks(n):
+    repositories = datagen.make_repositories(n)
+    trees = [datagen.make_tree(4, 3) for _ in range(max(1, n // 100))]
+    authors = datagen.make_authors(max(1, n // 10))
+    excludes = ["id", "description", "packages.version", "children.secret", "children.children.secret"]
+    return [
+        ("flat", FlatMapper(many=True), repositories),
+        ("flat.compiled", FlatMapper.compile(), repositories),
+        ("deep", DeepMapper(many=True), repositories),
+        ("deep.compiled", DeepMapper.compile(), repositories),
+        ("fanout", FanoutMapper(many=True), repositories),
+        ("nested.many", NestedMapper(many=True), repositories),
+        ("nested.many.compiled", NestedMapper.compile(), repositories),
+        ("composed.aggregate", ComposedMapper(many=True), repositories),
+        ("self.recursive", TreeMapper(many=True), trees),
+        ("lazy.mutual", AuthorMapper(many=True), authors),
+        ("excludes.heavy", NestedMapper(many=True, excludes=excludes), repositories),
+        ("excludes.recursive", TreeMapper(many=True, excludes=excludes), trees),
+    ]
+
+
+def measure(fn, dataset, repeat):
+    if not isinstance(fn, Remapper):  # compiled function
+        compiled = fn
+        fn = lambda dataset: [compiled(d) for d in dataset]  # NOQA
+    fn(dataset)  # warm up (compile, lazy loading)
+    best = min(timeit.repeat(lambda: fn(dataset), number=1, repeat=repeat))
+    tracemalloc.start()
+    fn(dataset)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops": len(dataset) / best, "seconds": best, "peak": peak}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=10000, help="number of records")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-k", default=None, help="only run benchmarks containing this string")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    parser.add_argument("--compare", default=None, help="compare with results of previous --json")
+    args = parser.parse_args(argv)
+
+    base = {}
+    if args.compare:
+        with open(args.compare) as rf:
+            base = json.load(rf)["results"]
+
+    results = {}
+    print("{:<24} {:>14} {:>12} {:>10}".format("name", "ops/sec", "peak(KiB)", "diff"))
+    for name, fn, dataset in make_benchmarks(args.n):
+        if args.k and args.k not in name:
+            continue
+        r = results[name] = measure(fn, dataset, args.repeat)
+        diff = ""
+        if name in base:
+            diff = "{:+.1f}%".format((r["ops"] / base[name]["ops"] - 1) * 100)
+        print("{:<24} {:>14.1f} {:>12.1f} {:>10}".format(name, r["ops"], r["peak"] / 1024.0, diff))
+
+    if args.json:
+        with open(args.json, "w") as wf:
+            json.dump({"n": args.n, "python": sys.version, "time": time.time(), "results": results}, wf, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,44 @@
 # -*- coding:utf-8 -*-
 from collections import defaultdict, OrderedDict, namedtuple
+from collections.abc import Mapping
 from importlib import import_module
 from functools import partial
+from operator import attrgetter, itemgetter
+import array
+import itertools
 import copy
+import reprlib
+import sys
+import threading
+import weakref
 
 
 Frame = namedtuple("Frame", "name remapper excludes")
+FieldError = namedtuple("FieldError", "fields error")
+Collected = namedtuple("Collected", "result errors")
+
+if sys.version_info >= (3, 7):
+    ordered_dict = dict  # insertion order is guaranteed
+else:
+    ordered_dict = OrderedDict
+
+
+class MissingKeyError(KeyError):
+    # the message is formatted only when it is needed (data can be huge)
+    def __init__(self, keys, data, fields=()):
+        super(MissingKeyError, self).__init__(keys)
+        self.keys = keys
+        self.data = data
+        self.fields = fields
+
+    def __str__(self):
+        message = "{k} is not in {v}".format(k=self.keys, v=reprlib.repr(self.data))
+        if self.fields:
+            message = "{} (field: {})".format(message, ".".join(self.fields))
+        return message
+
+    def __reduce__(self):
+        return (self.__class__, (self.keys, self.data, self.fields))
 
 
 def import_symbol(x):
@@ -17,14 +50,68 @@ def import_symbol(x):
 class Counter(object):
     def __init__(self, i=0):
         self.i = i
+        self.lock = threading.Lock()
 
     def __call__(self):
-        self.i += 1
-        return self.i
+        with self.lock:
+            self.i += 1
+            return self.i
 
 count = Counter(0)
 
 
+_class_lock = threading.RLock()  # for the caches on remapper classes (_paths, _plans, _compiled)
+
+
+class LRU(OrderedDict):
+    # bounded cache, for keys which clients can choose (e.g. only=). the least recently used entry is dropped
+    def __init__(self, maxsize=1024):
+        super(LRU, self).__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+            self.move_to_end(key)
+        except KeyError:  # (also evicted by other threads)
+            return default
+        return value
+
+    def __setitem__(self, key, value):
+        super(LRU, self).__setitem__(key, value)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+_resolved = {}  # (path, many, excludes, loader) -> remapper
+_resolving = threading.Lock()
+_lazies = weakref.WeakSet()
+
+
+def resolve_mapper(path, many=False, excludes=None, loader=import_symbol):
+    excludes = ExcludeSet(excludes)
+    key = (path, many, excludes.data, loader)
+    mapper = _resolved.get(key)
+    if mapper is None:
+        with _resolving:
+            mapper = _resolved.get(key)
+            if mapper is None:
+                mapper = _resolved[key] = loader(path)(many=many, excludes=excludes)
+    return mapper
+
+
+def resolve_all(*classes):
+    # warm-up, resolving LazyMapperCallables (of the remapper classes, or all of them) before the first call
+    if classes:
+        lazies = [path.callback for cls in classes for path in cls.get_paths().values()
+                  if isinstance(getattr(path, "callback", None), LazyMapperCallable)]
+    else:
+        lazies = list(_lazies)
+    for lazy in lazies:
+        if lazy.path != "self" and lazy.wrapper is None:
+            resolve_mapper(lazy.path, many=lazy.many, excludes=lazy.excludes, loader=lazy.loader)
+
+
 class LazyMapperCallable(object):
     def __init__(self, path, many=False, excludes=None, wrapper=None, loader=import_symbol):
         self.path = path
@@ -32,23 +119,99 @@ class LazyMapperCallable(object):
         self.excludes = ExcludeSet(excludes)
         self.many = many
         self.loader = loader
+        self.targets = {}  # class of caller -> remapper (None: caller itself)
+        _lazies.add(self)
 
-    def __call__(self, data, stack):
-        mapper = stack[-1].remapper
-        if self.path == "self" or self.path == mapper.__class__.__name__:
-            fn = mapper
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["targets"] = {}  # resolved again, in other process
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _lazies.add(self)
+
+    def resolve(self, cls):
+        if self.path == "self" or self.path == cls.__name__:
+            return None
         elif self.wrapper is not None:
-            fn = self.wrapper
-        else:
-            fn = self.wrapper = self.loader(self.path)(many=self.many, excludes=self.excludes)
+            return self.wrapper
+        return resolve_mapper(self.path, many=self.many, excludes=self.excludes, loader=self.loader)
+
+    def get_target(self, mapper):
+        fn = self.targets.get(mapper.__class__, marker)
+        if fn is marker:
+            fn = self.targets[mapper.__class__] = self.resolve(mapper.__class__)
+        if fn is None:
+            return mapper
+        return fn
+
+    def __call__(self, data, stack):
+        fn = self.get_target(stack[-1].remapper)
         excludes_dict = fn.get_current_excludes_dict(stack, excludes=self.excludes)
-        if self.many:
+        if self.many == STREAM:
+            return fn.iter_many(data, stack, excludes_dict)
+        elif type(stack) is not list and getattr(stack, "memo", None) is not None:
+            return memoized(fn, data, stack, excludes_dict, self.many)
+        elif self.many:
             return fn.as_list(data, stack, excludes_dict)
         else:
             return fn.as_dict(data, stack, excludes_dict)
 
 
 Self = partial(LazyMapperCallable, "self")
+STREAM = "stream"
+
+
+class MemoStack(list):
+    # with memo=True, results of nested mappers are shared in a call (see memoized)
+    def __init__(self, frames=(), memo=None):
+        super(MemoStack, self).__init__(frames)
+        self.memo = {} if memo is None else memo
+
+    def __copy__(self):
+        return MemoStack(self, memo=self.memo)
+
+
+def memoized(mapper, data, stack, excludes_dict, many):
+    # keyed by the source object's id. the source is kept in the memo, so the id is not reused in the call
+    if many and not mapper.get_plan(excludes_dict).batched:
+        return [memoized(mapper, x, stack, excludes_dict, False) for x in data]
+    key = (mapper.__class__, excludes_dict, bool(many), id(data))
+    memo = stack.memo
+    hit = memo.get(key)
+    if hit is not None and hit[0] is data:
+        return hit[1]
+    if many:
+        result = mapper.as_list(data, stack, excludes_dict)
+    else:
+        result = mapper.as_dict(data, stack, excludes_dict)
+    memo[key] = (data, result)
+    return result
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def remap_chunk(remapper, chunk):
+    # with the remapper's options (collect_errors, iterative, memo), as a top-level call for the list
+    if remapper.many is not True:
+        remapper = copy.copy(remapper)
+        remapper.many = True
+    return remapper.remap_root(chunk)
+
+
+def to_array(values, dtype):
+    if isinstance(dtype, str) and len(dtype) == 1 and dtype in array.typecodes:
+        return array.array(dtype, values)
+    import numpy  # optional
+    return numpy.asarray(values, dtype=dtype)
 
 
 def maybe_list(xs, delimiter="."):
@@ -61,69 +224,263 @@ def maybe_list(xs, delimiter="."):
 marker = object()
 
 
+def identity(x):
+    return x
+
+
+def build_getter(chain):
+    if not chain:
+        return identity
+    elif len(chain) == 1:
+        return itemgetter(chain[0])
+    elif len(chain) == 2:
+        k0, k1 = chain
+        return lambda data: data[k0][k1]
+    else:
+        chain = tuple(chain)
+
+        def getter(data):
+            for k in chain:
+                data = data[k]
+            return data
+        return getter
+
+
+def build_attr_getter(chain):  # e.g. ["a", "b", 0] -> lambda d: d.a.b[0]
+    if not chain:
+        return identity
+    elif all(hasattr(k, "endswith") for k in chain):
+        get = attrgetter(".".join(chain))
+    else:
+        steps = [itemgetter(k) if isinstance(k, int) else attrgetter(k) for k in chain]
+
+        def get(data):
+            for step in steps:
+                data = step(data)
+            return data
+
+    def getter(data):
+        try:
+            return get(data)
+        except AttributeError:
+            raise KeyError(chain)  # missing (default is used)
+    return getter
+
+
+_item_sources = {}  # type -> accessed by item or not (for access_mode="auto")
+
+
+def is_item_source(t):
+    r = _item_sources.get(t)
+    if r is None:
+        r = _item_sources[t] = issubclass(t, Mapping) or (hasattr(t, "keys") and hasattr(t, "__getitem__"))
+    return r
+
+
+def build_auto_getter(chain):
+    if not chain:
+        return identity
+    chain = tuple((k, isinstance(k, int)) for k in chain)
+
+    def getter(data):
+        try:
+            for k, index in chain:
+                if index or is_item_source(type(data)):
+                    data = data[k]
+                else:
+                    data = getattr(data, k)
+            return data
+        except AttributeError:
+            raise KeyError(k)
+    return getter
+
+
+GETTERS = {"item": build_getter, "attr": build_attr_getter, "auto": build_auto_getter}
+
+
+def build_accessor(keys, leaf=None, mode="item"):  # e.g. ["a", "b[]", "0"] -> lambda d: [x[0] for x in d["a"]["b"]]
+    build_getter = GETTERS[mode]
+    chain = []
+    for i, k in enumerate(keys):
+        if k.endswith("[]"):
+            chain.append(k[:-2])
+            head = build_getter(chain)
+            rest = build_accessor(keys[i + 1:], leaf=leaf, mode=mode)
+            if rest is identity:
+                return lambda data: list(head(data))
+            return lambda data: [rest(subdata) for subdata in head(data)]
+        elif k.isdigit():
+            chain.append(int(k))
+        else:
+            chain.append(k)
+    getter = build_getter(chain)
+    if leaf is None:
+        return getter
+    elif getter is identity:
+        return leaf
+    return lambda data: leaf(getter(data))
+
+
 class Composed(object):
     aggregate = False
 
-    def __init__(self, xs, callback=sum, tmpstate=False, name=None):
+    def __init__(self, xs, callback=sum, tmpstate=False, name=None, dtype=None):
         self.xs = xs
         self._i = count()
         self.callback = callback
         self.tmpstate = tmpstate
         self.name = name
+        self.dtype = dtype
 
     def __call__(self, data, stack):
         ys = [x(data, stack) for x in self.xs]
         return self.callback(*ys)
 
+    def with_access_mode(self, mode):
+        composed = copy.copy(self)
+        composed.xs = [x.with_access_mode(mode) if hasattr(x, "with_access_mode") else x for x in self.xs]
+        return composed
+
 
 class Aggregate(object):
     aggregate = True
 
-    def __init__(self, callback, tmpstate=False):
+    def __init__(self, callback, tmpstate=False, name=None, dtype=None, depends=None):
         self._i = count()
         self.tmpstate = tmpstate
         self.callback = callback
+        self.name = name
+        self.dtype = dtype
+        self.depends = depends  # names of fields read by callback (None: unknown), for remap_incremental()
 
     def __call__(self, data):
         return self.callback(data)
 
 
+def flatten(value, depth, values):
+    # appends values fanned out depth times (e.g. "a[].b[].c" -> 2), and returns the shape for unflatten()
+    if depth == 1:
+        values.extend(value)
+        return len(value)
+    return [flatten(x, depth - 1, values) for x in value]
+
+
+def unflatten(it, shape):
+    if type(shape) is int:
+        return list(itertools.islice(it, shape))
+    return [unflatten(it, sub) for sub in shape]
+
+
+class Unbatched(object):
+    # batch_callback, called for a single record
+    def __init__(self, fn, fanout):
+        self.fn = fn
+        self.fanout = fanout  # the number of fan-outs
+
+    def __call__(self, value):
+        if self.fanout > 1:
+            values = []
+            shape = flatten(value, self.fanout, values)
+            return unflatten(iter(self.fn(values)), shape)
+        elif self.fanout:
+            return list(self.fn(list(value)))
+        return self.fn([value])[0]
+
+
 class Path(object):
     aggregate = False
+    access_mode = "item"
 
-    def __init__(self, keys, callback=None, default=marker, tmpstate=False, name=None):
+    def __init__(self, keys, callback=None, default=marker, tmpstate=False, name=None, batch_callback=None,
+                 dtype=None):
         self._i = count()
         self.default = default
         self.keys = maybe_list(keys)
+        self.accessor = build_accessor(self.keys)
         self.callback = callback
         self.tmpstate = tmpstate
         self.name = name
+        self.dtype = dtype  # for as_columns(). array's typecode (e.g. "d") or numpy's dtype
+        # batch_callback is called with values of all records (with many=True), or fanned out values
+        self.batch_callback = batch_callback
+        self.fanout = sum(1 for k in self.keys if hasattr(k, "endswith") and k.endswith("[]"))
+        if batch_callback is not None:
+            if callback is not None:
+                raise ValueError("callback and batch_callback are exclusive")
+            self.callback = Unbatched(batch_callback, self.fanout)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["accessor"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.accessor = build_accessor(self.keys, mode=self.access_mode)
+
+    def with_access_mode(self, mode):
+        # a copy of the path, accessing data by attribute ("attr") or by the type of data ("auto")
+        if mode == self.access_mode:
+            return self
+        path = copy.copy(self)
+        path.access_mode = mode
+        path.accessor = build_accessor(self.keys, mode=mode)
+        return path
 
     def access(self, data, stack, keys):
-        if not keys:
-            return data
-        else:
-            k = keys[0]
-            rest_keys = keys[1:]
-            if k.endswith("[]"):
-                return [self.access(subdata, stack, rest_keys) for subdata in data[k[:-2]]]
-            elif k.isdigit():
-                return self.access(data[int(k)], stack, rest_keys)
-            else:
-                return self.access(data[k], stack, rest_keys)
+        if keys is self.keys:
+            return self.accessor(data)
+        return build_accessor(keys, mode=self.access_mode)(data)
 
     def __call__(self, data, stack):
         try:
-            result = self.access(data, stack, self.keys)
+            result = self.accessor(data)
         except KeyError:
-            if self.default is marker:
-                raise KeyError("{k} is not in {v}".format(k=self.keys, v=data))
-            return self.default
+            return self.on_missing(data, stack)
         if self.callback is not None:
-            if hasattr(self.callback, "many"):  # remapper
-                result = self.callback(result, stack=stack)
+            return self.convert(result, stack)
+        return result
+
+    def on_missing(self, data, stack):
+        if self.default is marker:
+            if hasattr(stack, "on_missing"):
+                stack.on_missing(self)
+            raise MissingKeyError(self.keys, data, tuple(frame.name for frame in stack))
+        if hasattr(stack, "on_default"):
+            stack.on_default(self)
+        return self.default
+
+    def convert(self, result, stack):
+        if hasattr(self.callback, "many"):  # remapper
+            return self.callback(result, stack=stack)
+        return self.callback(result)
+
+    def batch(self, dataset, stack):
+        # calls batch_callback once for the dataset, and scatters the results
+        result = []
+        indexes = []
+        shapes = []
+        values = []
+        for data in dataset:
+            try:
+                value = self.accessor(data)
+            except KeyError:
+                result.append(self.on_missing(data, stack))
+                continue
+            indexes.append(len(result))
+            result.append(None)
+            if self.fanout:
+                shapes.append(flatten(value, self.fanout, values))
             else:
-                result = self.callback(result)
+                values.append(value)
+        converted = self.batch_callback(values) if values else ()  # only fanned out values can be empty
+        if self.fanout:
+            it = iter(converted)
+            for i, shape in zip(indexes, shapes):
+                result[i] = unflatten(it, shape)
+        else:
+            for i, value in zip(indexes, converted):
+                result[i] = value
         return result
 
 
@@ -139,7 +496,78 @@ class ChangeOrder(object):
         return getattr(self.path, k)
 
 
-EMPTY = {"": set()}
+class ExcludeTrie(object):
+    # immutable and hash-consed (see make_trie), so identity can be used as equality
+    #   hidden: output names of fields, which are computed only for aggregates (see resolve_only)
+    __slots__ = ("names", "children", "hidden")
+
+    def __init__(self, names, children, hidden=frozenset()):
+        self.names = names
+        self.children = children
+        self.hidden = hidden
+
+    def __getitem__(self, k):
+        if k == "":
+            return self.names
+        return self.children[k]
+
+    def get(self, k, default=None):
+        if k == "":
+            return self.names
+        return self.children.get(k, default)
+
+    def keys(self):
+        return [""] + list(self.children.keys())
+
+    def __reduce__(self):
+        return (make_trie, (self.names, self.children, self.hidden))
+
+    def __repr__(self):
+        if self.hidden:
+            return "<ExcludeTrie names={!r} children={!r} hidden={!r}>".format(
+                sorted(self.names), self.children, sorted(self.hidden)
+            )
+        return "<ExcludeTrie names={!r} children={!r}>".format(sorted(self.names), self.children)
+
+
+# bounded. an evicted trie is rebuilt as a new object, which costs only cache misses (excludes are compared by identity)
+_tries = LRU(8192)
+_merged = LRU(8192)
+
+
+def make_trie(names, children, hidden=()):
+    names = frozenset(names)
+    hidden = frozenset(hidden)
+    key = (names, tuple(sorted(children.items())), hidden)
+    if not names and not children and not hidden:
+        return EMPTY
+    trie = _tries.get(key)
+    if trie is None:
+        with _class_lock:
+            trie = _tries.get(key)
+            if trie is None:
+                trie = _tries[key] = ExcludeTrie(names, dict(children), hidden)
+    return trie
+
+
+EMPTY = ExcludeTrie(frozenset(), {})
+
+
+def merge_trie(t0, t1):
+    if t1 is EMPTY or t0 is t1:
+        return t0
+    elif t0 is EMPTY:
+        return t1
+    key = (t0, t1)
+    merged = _merged.get(key)
+    if merged is None:
+        children = dict(t0.children)
+        for k, v in t1.children.items():
+            children[k] = merge_trie(children[k], v) if k in children else v
+        merged = make_trie(t0.names | t1.names, children, t0.hidden | t1.hidden)
+        with _class_lock:
+            _merged[key] = merged
+    return merged
 
 
 class ExcludeSet(object):
@@ -147,6 +575,8 @@ class ExcludeSet(object):
         if excludes is None:
             self.data = EMPTY
         elif hasattr(excludes, "transform"):
+            self.data = excludes.data
+        elif isinstance(excludes, ExcludeTrie):
             self.data = excludes
         else:
             self.data = self.transform(excludes)
@@ -163,10 +593,10 @@ class ExcludeSet(object):
             if "" not in target:
                 target[""] = set()
             target[""].add(ks[-1])
-        return d
+        return freeze(d)
 
-    def merge(self, d):
-        return merge_dict(copy.deepcopy(self.data), d)
+    def merge(self, trie):
+        return merge_trie(self.data, trie)
 
     def __getitem__(self, k):
         return self.data[k]
@@ -175,97 +605,540 @@ class ExcludeSet(object):
         return self.data.get(k, default)
 
 
-def merge_dict(d0, d1):  # side effect
-    for k, v in d1.items():
-        if k not in d0:
-            d0[k] = d1[k]
-        elif hasattr(v, "keys"):
-            merge_dict(d0[k], v)
+def freeze(d):
+    return make_trie(d.get("", ()), {k: freeze(v) for k, v in d.items() if k != ""})
+
+
+_only = LRU(1024)  # (remapper class, include list) -> excludes trie
+
+
+def resolve_only(cls, only):
+    # include list (e.g. ["id", "children.name"]) -> excludes trie, excluding the other fields (resolved once).
+    # fields read by selected aggregates are kept, but hidden from the output
+    key = (cls, tuple(sorted(set(only))))
+    trie = _only.get(key)
+    if trie is None:
+        with _class_lock:
+            trie = _only.get(key)
+            if trie is None:
+                trie = _only[key] = only_trie(cls, include_tree(key[1]))
+    return trie
+
+
+def include_tree(only):  # e.g. ["a", "b.c", "b.d"] -> {"a": None, "b": {"c": None, "d": None}}
+    tree = {}
+    for keys in only:
+        ks = keys.split(".")
+        node = tree
+        for k in ks[:-1]:
+            child = node.get(k, marker)
+            if child is None:  # the whole field is already selected
+                break
+            elif child is marker:
+                child = node[k] = {}
+            node = child
+        else:
+            node[ks[-1]] = None
+    return tree
+
+
+def merge_tree(x, y):
+    if x is None or y is None:
+        return None
+    merged = dict(x)
+    for k, v in y.items():
+        merged[k] = merge_tree(merged[k], v) if k in merged else v
+    return merged
+
+
+def only_trie(cls, tree):
+    # fields are selected by output names or by attribute names (as excludes)
+    outputs = OrderedDict((path.name or name, (name, path)) for name, path in cls.get_paths().items())
+    attributes = {name: k for k, (name, _) in outputs.items()}
+    unknown = [k for k in tree if k not in outputs and k not in attributes]
+    if unknown:
+        raise ValueError("unknown fields of {}: {}".format(cls.__name__, ", ".join(sorted(unknown))))
+    selected = {}
+    for k, sub in tree.items():
+        k = k if k in outputs else attributes[k]
+        selected[k] = merge_tree(selected[k], sub) if k in selected else sub
+    tree = selected
+
+    aggregates = [k for k in tree if outputs[k][1].aggregate]
+    depends = set()  # fields read by the selected aggregates (and by aggregates which they read)
+    pending = list(aggregates)
+    while pending:
+        path = outputs[pending.pop()][1]
+        if getattr(path, "depends", None) is None:
+            depends = None  # unknown, all fields are needed
+            break
+        for k in path.depends:
+            if k not in depends:
+                depends.add(k)
+                if k in outputs and outputs[k][1].aggregate:
+                    pending.append(k)
+
+    names = set()
+    hidden = set()
+    children = {}
+    for k, (name, path) in outputs.items():
+        if k in tree:
+            if tree[k] is not None:
+                target = nested_class(cls, path)
+                if target is None:
+                    raise ValueError("{} of {} is not a nested remapper field".format(k, cls.__name__))
+                children[k] = only_trie(target, tree[k])
+        elif aggregates and (path.tmpstate or depends is None or k in depends):
+            hidden.add(k)
         else:
-            d0[k].update(d1[k])
-    return d0
+            names.add(name)
+    return make_trie(names, children, hidden)
+
+
+def nested_class(cls, path):
+    # the remapper class for the field's value, or None
+    while isinstance(path, ChangeOrder):
+        path = path.path
+    callback = getattr(path, "callback", None)
+    if isinstance(callback, LazyMapperCallable):
+        wrapper = callback.resolve(cls)
+        return cls if wrapper is None else wrapper.__class__
+    elif isinstance(callback, Remapper):
+        return callback.__class__
+    return None
 
 
 class Shortcut(object):
     def __init__(self, remapper, keys):
         self.remapper = remapper
         self.keys = maybe_list(keys)
+        self.accessor = build_accessor(self.keys, leaf=remapper)
+
+    def __getstate__(self):
+        return {"remapper": self.remapper, "keys": self.keys}
+
+    def __setstate__(self, state):
+        self.__init__(state["remapper"], state["keys"])
 
     def __call__(self, data):
-        return self.access(data, self.keys)
+        return self.accessor(data)
 
     def access(self, data, keys):
-        if not keys:
-            return self.remapper(data)
-        else:
-            k = keys[0]
-            rest_keys = keys[1:]
-            if k.endswith("[]"):
-                return [self.access(subdata, rest_keys) for subdata in data[k[:-2]]]
-            elif k.isdigit():
-                return self.access(data[int(k)], rest_keys)
-            else:
-                return self.access(data[k], rest_keys)
+        if keys is self.keys:
+            return self.accessor(data)
+        return build_accessor(keys, leaf=self.remapper)(data)
 
 
 class Remapper(object):
-    dict = OrderedDict
+    dict = ordered_dict
+    access_mode = "item"  # or "attr" (objects, namedtuples, dataclasses), "auto" (chosen by type, per step)
 
     def __new__(cls, *args, **kwargs):
-        if "_paths" not in cls.__dict__:
-            paths = defaultdict(list)
-            for c in cls.mro():
-                for name, attr in c.__dict__.items():
-                    if hasattr(attr, "_i"):  # path
-                        paths[name].append(attr)
-            cls._paths = OrderedDict((k, v[0]) for k, v in sorted(paths.items(), key=lambda vs: vs[1][0]._i))
+        cls.get_paths()
         return super(Remapper, cls).__new__(cls)
 
-    def __init__(self, many=False, excludes=None):
+    @classmethod
+    def get_paths(cls):
+        paths = cls.__dict__.get("_paths")
+        if paths is None:
+            with _class_lock:
+                paths = cls.__dict__.get("_paths")
+                if paths is None:
+                    paths = defaultdict(list)
+                    for c in cls.mro():
+                        for name, attr in c.__dict__.items():
+                            if hasattr(attr, "_i"):  # path
+                                paths[name].append(attr)
+                    paths = OrderedDict((k, v[0]) for k, v in sorted(paths.items(), key=lambda vs: vs[1][0]._i))
+                    cls._paths = paths
+        return paths
+
+    @classmethod
+    def compile(cls, excludes=None, only=None):
+        from .compiler import compile_remapper
+        excludes = ExcludeSet(excludes)
+        if only is not None:
+            excludes = ExcludeSet(excludes.merge(resolve_only(cls, only)))
+        return compile_remapper(cls, excludes.data)
+
+    def __init__(self, many=False, excludes=None, profiler=None, iterative=False, max_depth=None, collect_errors=False,
+                 memo=False, cache=None, only=None):
         self.many = many
+        self.memo = memo
+        self.cache = cache  # e.g. dictremapper.cache.ResultCache
         self.excludes = ExcludeSet(excludes)
+        if only is not None:  # e.g. ["id", "children.name"], the other fields are excluded
+            self.excludes = ExcludeSet(self.excludes.merge(resolve_only(self.__class__, only)))
+        self.profiler = profiler
+        self.collect_errors = collect_errors
+        self.iterative = iterative  # nested mappers are run without recursion (see iterative.run)
+        self.max_depth = max_depth
+
+    def __getstate__(self):
+        # the cache (with a lock) is local to the process, e.g. workers of map_parallel() remap without it
+        state = self.__dict__.copy()
+        state["cache"] = None
+        return state
+
+    def new_stack(self):
+        if self.profiler is None:
+            return MemoStack() if self.memo else []
+        stack = self.profiler.stack()
+        if self.memo:
+            stack.memo = {}
+        return stack
 
     def __call__(self, data, stack=None, excludes_dict=None):
-        stack = stack or []
+        if stack is None:
+            if self.cache is not None:
+                return self.cache.remap(self, data, excludes_dict or self.excludes.data)
+            return self.remap_root(data, excludes_dict)
         excludes_dict = excludes_dict or self.get_current_excludes_dict(stack)
-        if self.many:
+        if self.many == STREAM:
+            return self.iter_many(data, stack, excludes_dict)
+        elif type(stack) is not list and getattr(stack, "memo", None) is not None and stack:  # nested
+            return memoized(self, data, stack, excludes_dict, self.many)
+        elif self.many:
             return self.as_list(data, stack, excludes_dict)
         else:
             return self.as_dict(data, stack, excludes_dict)
 
+    def remap_root(self, data, excludes_dict=None):  # top-level call
+        excludes_dict = excludes_dict or self.excludes.data
+        if self.collect_errors:
+            return self.collect(data, excludes_dict)
+        elif self.iterative:
+            return self.run_iterative(data, excludes_dict)
+        return self(data, self.new_stack(), excludes_dict)
+
     def as_list(self, dataset, stack, excludes_dict):
+        plan = self.get_plan(excludes_dict)
+        if plan.batched and self.__class__.as_dict is Remapper.as_dict:
+            return self.as_batch(list(dataset), stack, plan)
         return [self.as_dict(data, stack, excludes_dict) for data in dataset]
 
+    def as_batch(self, dataset, stack, plan):
+        # fields having batch_callback are computed for all records at first
+        columns = []
+        for name, path, excludes in plan.fields:
+            if getattr(path, "batch_callback", None) is None:
+                columns.append(None)
+                continue
+            stack.append(Frame(name=name, remapper=self, excludes=excludes))
+            columns.append(path.batch(dataset, stack))
+            stack.pop()
+
+        fields = list(zip(plan.fields, columns))
+        result = []
+        for i, data in enumerate(dataset):
+            d = self.dict()
+            for (name, path, excludes), column in fields:
+                if column is not None:
+                    d[name] = column[i]
+                    continue
+                stack.append(Frame(name=name, remapper=self, excludes=excludes))
+                d[name] = path(data, stack)
+                stack.pop()
+            if plan.aggregates:
+                d = self._aggregate(d, plan, stack)
+            result.append(d)
+        return result
+
+    def as_columns(self, dataset, excludes_dict=None):
+        # {name: column} instead of rows. each field is computed for all records, without building rows
+        # (except for Aggregate, which needs rows)
+        dataset = dataset if isinstance(dataset, (list, tuple)) else list(dataset)
+        excludes_dict = excludes_dict or self.excludes.data
+        plan = self.get_plan(excludes_dict)
+        stack = self.new_stack()
+        columns = self.dict()
+        dtypes = {}
+        for name, path, excludes in plan.fields:
+            stack.append(Frame(name=name, remapper=self, excludes=excludes))
+            if getattr(path, "batch_callback", None) is not None:
+                columns[name] = path.batch(dataset, stack)
+            else:
+                columns[name] = [path(data, stack) for data in dataset]
+            stack.pop()
+            dtypes[name] = getattr(path, "dtype", None)
+        if plan.aggregates:
+            names = list(columns.keys())
+            rows = [self.dict(zip(names, values)) for values in zip(*columns.values())] if names else [
+                self.dict() for _ in dataset
+            ]
+            for name, path in plan.aggregates:
+                columns[name] = [path(d) for d in rows]
+                dtypes[name] = getattr(path, "dtype", None)
+            if plan.names is not None:
+                columns = self.dict([(name, columns[name]) for name in plan.names])
+        for name, dtype in dtypes.items():
+            if dtype is not None and name in columns:
+                columns[name] = to_array(columns[name], dtype)
+        return columns
+
+    def collect(self, data, excludes_dict):
+        # mapping doesn't stop at errors. returns Collected(result, errors) (errors for each record, if many)
+        if self.many:
+            result = []
+            errors = []
+            for x in data:
+                errs = []
+                result.append(self.collect_dict(x, [], excludes_dict, errs))
+                errors.append(errs)
+            return Collected(result, errors)
+        errors = []
+        return Collected(self.collect_dict(data, [], excludes_dict, errors), errors)
+
+    def collect_dict(self, data, stack, excludes_dict, errors):
+        plan = self.get_plan(excludes_dict)
+        d = self.dict()
+        depth = len(stack)
+        for name, path, excludes in plan.fields:
+            stack.append(Frame(name=name, remapper=self, excludes=excludes))
+            try:
+                d[name] = path(data, stack)
+            except Exception as e:
+                errors.append(FieldError(getattr(e, "fields", None) or tuple(frame.name for frame in stack), e))
+                del stack[depth + 1:]  # frames of nested mappers
+            stack.pop()
+        if plan.aggregates:
+            for name, path in plan.aggregates:
+                try:
+                    d[name] = path(d)
+                except Exception as e:
+                    errors.append(FieldError(tuple(frame.name for frame in stack) + (name, ), e))
+            if plan.names is not None:
+                return self.dict([(name, d[name]) for name in plan.names if name in d])
+        return d
+
+    def get_dumper(self):
+        from .compiler import compile_remapper, is_plain_remapper, encode
+        if not is_plain_remapper(self.__class__):  # customized as_dict() cannot be compiled
+            mapper = self.__class__(excludes=self.excludes.data)
+            return lambda data, w: w(encode(mapper(data)))
+        return compile_remapper(self.__class__, self.excludes.data, json=True)
+
+    def dumps(self, data):
+        # same as json.dumps(self(data)), without building dicts
+        from .compiler import dump_many
+        dump = self.get_dumper()
+        parts = []
+        if self.many:
+            dump_many(dump, data, parts.append)
+        else:
+            dump(data, parts.append)
+        return "".join(parts)
+
+    def dumps_bytes(self, data):
+        return self.dumps(data).encode("utf-8")
+
+    def dump(self, data, fp):
+        fp.write(self.dumps(data))
+
+    def dump_lines(self, dataset, fp, chunksize=1000):
+        # JSONL
+        dump = self.get_dumper()
+        for chunk in chunked(dataset, chunksize):
+            parts = []
+            w = parts.append
+            for data in chunk:
+                dump(data, w)
+                w("\n")
+            fp.write("".join(parts))
+
+    def get_projection(self):
+        # the part of a record, which this mapper reads (see dictremapper.projection). also with many=True
+        from .projection import get_projection
+        return get_projection(self.__class__, self.excludes.data)
+
+    def source_paths(self):
+        # paths in a record (also with many=True)
+        from .projection import source_paths
+        return source_paths(self.get_projection())
+
+    def loads(self, text):
+        # json.loads() only the needed part, and remapping it
+        from .projection import loads, each
+        projection = self.get_projection()
+        if self.many and projection is not None:
+            projection = each(projection)
+        return self(loads(text, projection))
+
+    def view(self, data):
+        # read-only mapping computing each field on access (see dictremapper.view)
+        from .view import view
+        excludes_dict = self.excludes.data
+        if self.many == STREAM:
+            return (view(self, x, excludes_dict) for x in data)
+        elif self.many:
+            return [view(self, x, excludes_dict) for x in data]
+        return view(self, data, excludes_dict)
+
+    def remap_incremental(self, old_output, changed_paths, new_data):
+        # recomputes only fields depending on changed_paths (e.g. ["status", "items.3.count"])
+        from .incremental import remap_incremental
+        return remap_incremental(self, old_output, changed_paths, new_data)
+
+    def run_iterative(self, data, excludes_dict):
+        from .iterative import run
+        if self.many == STREAM:
+            return (run(self, x, excludes_dict, self.max_depth) for x in data)
+        elif self.many:
+            return [run(self, x, excludes_dict, self.max_depth) for x in data]
+        else:
+            return run(self, data, excludes_dict, self.max_depth)
+
+    def map_parallel(self, dataset, executor=None, chunksize=1000):
+        # self (and its class, by module path) is pickled, for each chunk
+        if self.profiler is not None:
+            raise ValueError("profiler is not supported by map_parallel() (stats of workers are not merged)")
+        if executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor() as executor:
+                return self.map_parallel(dataset, executor=executor, chunksize=chunksize)
+        result = []
+        errors = []
+        for remapped in executor.map(remap_chunk, itertools.repeat(self), chunked(dataset, chunksize)):
+            if self.collect_errors:
+                result.extend(remapped.result)
+                errors.extend(remapped.errors)
+            else:
+                result.extend(remapped)
+        if self.collect_errors:
+            return Collected(result, errors)
+        return result
+
+    def map_threaded(self, dataset, max_workers=None, chunksize=1000):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers) as executor:
+            return self.map_parallel(dataset, executor=executor, chunksize=chunksize)
+
+    def iter_many(self, dataset, stack=None, excludes_dict=None):
+        # the caller's stack is changed, until this generator is consumed
+        stack = self.new_stack() if stack is None else copy.copy(stack)
+        excludes_dict = excludes_dict or self.get_current_excludes_dict(stack)
+        return self._iter_many(dataset, stack, excludes_dict)
+
+    def _iter_many(self, dataset, stack, excludes_dict):
+        for data in dataset:
+            yield self.as_dict(data, stack, excludes_dict)
+
     def get_current_excludes_dict(self, stack, excludes=None):
         excludes = excludes or self.excludes
         if not stack:
-            return excludes
+            return excludes.data
         return excludes.merge(stack[-1].excludes)
 
+    @classmethod
+    def get_plan(cls, excludes_dict):
+        plan = cls.__dict__.get("_plans", EMPTY_PLANS).get(excludes_dict)
+        if plan is None:
+            with _class_lock:
+                plans = cls.__dict__.get("_plans")
+                if plans is None:
+                    plans = cls._plans = LRU(1024)
+                plan = plans.get(excludes_dict)
+                if plan is None:
+                    plan = plans[excludes_dict] = Plan(cls, excludes_dict)
+        return plan
+
     def as_dict(self, data, stack, excludes_dict):
+        plan = self.get_plan(excludes_dict)
         d = self.dict()
-        dummy = object()
-        lazies = []
-        excludes = excludes_dict.get("", [])
+        for name, path, excludes in plan.fields:
+            stack.append(Frame(name=name, remapper=self, excludes=excludes))
+            d[name] = path(data, stack)
+            stack.pop()
+        if plan.aggregates:
+            return self._aggregate(d, plan, stack)
+        return d
 
-        for name, path in self._paths.items():
-            if name in excludes:
-                continue
-            name = path.name or name
-            if path.aggregate:
-                lazies.append((name, path))
-                d[name] = dummy
-            else:
-                stack.append(Frame(name=name, remapper=self, excludes=excludes_dict.get(name, EMPTY)))
-                d[name] = path(data, stack)
+    def _aggregate(self, d, plan, stack):
+        if hasattr(stack, "profiler"):  # timed, as fields
+            for name, path in plan.aggregates:
+                stack.append(Frame(name=name, remapper=self, excludes=EMPTY))
+                d[name] = path(d)
                 stack.pop()
-        for name, path in lazies:
-            d[name] = path(d)
-
-        for name, path in self._paths.items():
-            if name in excludes:
-                continue
-            name = path.name or name
-            if path.tmpstate:
-                d.pop(name)
+        else:
+            for name, path in plan.aggregates:
+                d[name] = path(d)
+        if plan.names is not None:
+            return self.dict([(name, d[name]) for name in plan.names])
         return d
+
+
+EMPTY_PLANS = {}
+
+
+class Plan(object):
+    # fields to compute for the (remapper class, excludes) pair. values only seen by aggregates (tmpstate) are
+    # computed when something aggregates them, and the output is projected (only if needed) to keep the field order
+    def __init__(self, cls, excludes_dict):
+        excludes = excludes_dict.get("", ())
+        entries = [(path.name or name, path) for name, path in cls.get_paths().items() if name not in excludes]
+        if cls.access_mode != "item":
+            entries = [
+                (name, path.with_access_mode(cls.access_mode) if hasattr(path, "with_access_mode") else path)
+                for name, path in entries
+            ]
+        aggregated = any(path.aggregate for _, path in entries)
+
+        self.fields = []
+        self.aggregates = []
+        names = []
+        for name, path in entries:
+            tmpstate = path.tmpstate or name in excludes_dict.hidden
+            if path.aggregate:
+                self.aggregates.append((name, path))
+            elif not tmpstate or aggregated:
+                self.fields.append((name, path, excludes_dict.get(name, EMPTY)))
+            if not tmpstate:
+                names.append(name)
+        computed = [name for name, _, _ in self.fields] + [name for name, _ in self.aggregates]
+        self.names = None if computed == names else names
+        self.batched = any(getattr(path, "batch_callback", None) is not None for _, path, _ in self.fields)
+        self.prefixes, self.shared = share_prefixes(self.fields)
+
+
+def split_chain(keys):  # e.g. ["a", "0", "b[]", "c"] -> (["a", 0, "b"], ["c"], True)
+    chain = []
+    for i, k in enumerate(keys):
+        if k.endswith("[]"):
+            chain.append(k[:-2])
+            return chain, keys[i + 1:], True
+        chain.append(int(k) if k.isdigit() else k)
+    return chain, [], False
+
+
+def share_prefixes(fields):
+    # groups Paths by key prefix (e.g. owner.login, owner.id), for looking up the shared intermediate object
+    # once per record (used by the compiled engine. in the interpreted one, the bookkeeping costs more than
+    # the saved lookups).
+    #   prefixes: [(parent index, keys from the parent)], index 0 is the data itself, i-th prefix is index i+1
+    #   shared: {field index: (prefix index, rest of chain, rest of keys after fan-out, fan-out or not)}
+    chains = {}
+    for i, (name, path, excludes) in enumerate(fields):
+        while isinstance(path, ChangeOrder):
+            path = path.path
+        if type(path) is Path and path.access_mode == "item" and all(hasattr(k, "endswith") for k in path.keys):
+            chains[i] = split_chain(path.keys)
+
+    counts = defaultdict(int)
+    for chain, rest, fanout in chains.values():
+        for j in range(1, len(chain) + 1):
+            counts[tuple(chain[:j])] += 1
+    shared = sorted((prefix for prefix, n in counts.items() if n > 1), key=len)
+
+    indices = {(): 0}
+    prefixes = []
+    for prefix in shared:
+        parent = max((p for p in indices if prefix[:len(p)] == p), key=len)
+        prefixes.append((indices[parent], prefix[len(parent):]))
+        indices[prefix] = len(prefixes)
+
+    fields_map = {}
+    for i, (chain, rest, fanout) in chains.items():
+        prefix = max((p for p in indices if tuple(chain[:len(p)]) == p), key=len)
+        if prefix:
+            fields_map[i] = (indices[prefix], chain[len(prefix):], rest, fanout)
+    return prefixes, fields_map
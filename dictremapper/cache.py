@@ -0,0 +1,214 @@
+# -*- coding:utf-8 -*-
+import marshal
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from . import STREAM, marker
+from .projection import get_projection, each, EACH
+
+CacheInfo = namedtuple("CacheInfo", "hits misses evictions maxsize currsize")
+
+
+class ResultCache(object):
+    # results of top-level calls (Remapper(cache=ResultCache())), keyed by the mapper class, the effective excludes and
+    # the part of the input which the mapper reads (see fingerprint). LRU, and entries are expired after ttl seconds.
+    #   copy=True: a copy of the cached result is returned. copy=False: the cached result is shared (and frozen)
+    def __init__(self, maxsize=1024, ttl=None, copy=True, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.copy = copy
+        self.timer = timer
+        self.data = OrderedDict()  # key -> (expires, result)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cache_info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.data))
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def remap(self, mapper, data, excludes_dict):
+        if mapper.many == STREAM:
+            return mapper.remap_root(data, excludes_dict)
+        try:
+            key = (mapper.__class__, excludes_dict, bool(mapper.many), mapper.collect_errors,
+                   get_fingerprint(mapper.__class__, excludes_dict, many=bool(mapper.many))(data))
+            hash(key)
+        except TypeError:  # not JSON like (e.g. objects, keyed only by identity), or unhashable input
+            return mapper.remap_root(data, excludes_dict)
+
+        result = self.get(key)
+        if result is not marker:
+            if not self.copy:
+                return result
+            elif type(result) is bytes:
+                return marshal.loads(result)
+            return copy_result(result)
+
+        result = mapper.remap_root(data, excludes_dict)
+        if not self.copy:
+            result = freeze(result)
+            self.set(key, result)
+            return result
+        try:
+            self.set(key, marshal.dumps(result))  # JSON like results are copied with marshal (fast, and compact)
+        except ValueError:
+            self.set(key, copy_result(result))
+        return result
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                self.misses += 1
+                return marker
+            expires, result = entry
+            if expires is not None and expires <= self.timer():
+                del self.data[key]
+                self.misses += 1
+                return marker
+            self.data.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def set(self, key, result):
+        expires = None if self.ttl is None else self.timer() + self.ttl
+        with self.lock:
+            self.data[key] = (expires, result)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+
+def get_fingerprint(cls, excludes_dict, many=False):
+    # many=True: for a list of records
+    plan = cls.get_plan(excludes_dict)
+    attr = "fingerprint_many" if many else "fingerprint"
+    fn = plan.__dict__.get(attr)
+    if fn is None:
+        projection = get_projection(cls, excludes_dict)
+        fn = build_fingerprint(each(projection) if many else projection, {})
+        setattr(plan, attr, fn)
+    return fn
+
+
+def fingerprint(data, projection=None):
+    # a hashable (and comparable) value, only from the part of the input in the projection.
+    # types are kept, because 1, 1.0 and True are equal
+    return build_fingerprint(projection, {})(data)
+
+
+_SCALARS = (int, float, bool, type(None))
+
+
+def fingerprint_all(data):
+    t = type(data)
+    if t is str:
+        return data
+    elif isinstance(data, dict):
+        return (dict, tuple([(k, fingerprint_all(v)) for k, v in data.items()]))
+    elif isinstance(data, list):
+        return (list, tuple([fingerprint_all(x) for x in data]))
+    elif isinstance(data, tuple):  # kept distinct from lists, the output can contain them as is
+        return (tuple, tuple([fingerprint_all(x) for x in data]))
+    elif t in _SCALARS:
+        return (t, data)
+    elif data is marker:  # missing
+        return data
+    raise TypeError("not JSON like: {!r}".format(t))  # mutable objects can't be keyed by value
+
+
+def build_fingerprint(projection, built):
+    # the fingerprint function specialized for the projection (cached on the plan)
+    if projection is None:
+        return fingerprint_all
+    fn = built.get(id(projection))
+    if fn is not None:
+        return fn
+    if EACH in projection:
+        return build_fingerprint_each(projection, built)
+    items = []
+    indexes = {}
+    fanout = any(not k.isdigit() for k in projection)
+
+    def fingerprint(data):
+        if isinstance(data, dict):
+            get = data.get
+            return tuple([f(get(k, marker)) for k, f in items])
+        elif isinstance(data, (list, tuple)):
+            xs = []
+            for i, x in enumerate(data):
+                f = indexes.get(i)
+                if f is not None:
+                    xs.append(f(x))
+                elif fanout:
+                    xs.append(fingerprint(x))
+            return (list if isinstance(data, list) else tuple, len(data), tuple(xs))
+        return fingerprint_all(data)
+
+    built[id(projection)] = fingerprint
+    for k, sub in projection.items():
+        items.append((int(k) if k.isdigit() else k, build_fingerprint(sub, built)))  # the key of the accessor
+        if k.isdigit():
+            indexes[int(k)] = fingerprint_all if fanout else build_fingerprint(sub, built)
+    return fingerprint
+
+
+class FrozenDict(dict):
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("cached result is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return (dict, (dict(self), ))
+
+
+class FrozenList(list):
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("cached result is read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = remove = pop = clear = sort = reverse = _immutable
+
+    def __reduce__(self):
+        return (list, (list(self), ))
+
+
+def freeze(result):
+    if isinstance(result, dict):
+        return FrozenDict([(k, freeze(v)) for k, v in result.items()])
+    elif isinstance(result, list):
+        return FrozenList([freeze(x) for x in result])
+    elif isinstance(result, tuple) and hasattr(result, "_fields"):  # e.g. Collected
+        return result.__class__(*[freeze(x) for x in result])
+    return result
+
+
+def copy_result(result):
+    if isinstance(result, dict):  # with the class of each dict (the dict of the mapper, at each level)
+        return result.__class__([(k, copy_result(v)) for k, v in result.items()])
+    elif isinstance(result, list):
+        return [copy_result(x) for x in result]
+    elif isinstance(result, tuple) and hasattr(result, "_fields"):
+        return result.__class__(*[copy_result(x) for x in result])
+    return result
+
+
+def build_fingerprint_each(projection, built):
+    f = build_fingerprint(projection[EACH], built)
+
+    def fingerprint(data):
+        if isinstance(data, (list, tuple)):
+            return (list if isinstance(data, list) else tuple, tuple([f(x) for x in data]))
+        return fingerprint_all(data)
+
+    built[id(projection)] = fingerprint
+    return fingerprint
@@ -0,0 +1,100 @@
+# -*- coding:utf-8 -*-
+import argparse
+import json
+import sys
+from . import import_symbol, chunked
+
+_dump = None
+
+
+def get_dump(path, excludes=None):
+    # dump(data, w), writing JSON text directly
+    return import_symbol(path)(excludes=excludes).get_dumper()
+
+
+def init_worker(path, excludes):
+    global _dump
+    _dump = get_dump(path, excludes=excludes)
+
+
+def remap_lines(lines, dump=None):
+    dump = dump or _dump
+    parts = []
+    w = parts.append
+    loads = json.loads
+    for line in lines:
+        if line.strip():
+            dump(loads(line), w)
+            w("\n")
+    return "".join(parts)
+
+
+def run(path, inp, out, excludes=None, workers=1, chunk_size=1000, ordered=True):
+    chunks = chunked(inp, chunk_size)
+    if workers <= 1:
+        dump = get_dump(path, excludes=excludes)
+        for chunk in chunks:
+            out.write(remap_lines(chunk, dump))
+        return
+
+    from multiprocessing import Pool
+    pool = Pool(workers, initializer=init_worker, initargs=(path, excludes))
+    try:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for text in imap(remap_lines, chunks):
+            out.write(text)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def positive_int(x):
+    n = int(x)
+    if n <= 0:
+        raise argparse.ArgumentTypeError("must be positive, got {}".format(x))
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="dictremapper", description="remapping JSONL, line by line")
+    parser.add_argument("mapper", help="dotted path of Remapper class (e.g. mymodule.MyMapper)")
+    parser.add_argument("-i", "--input", default=None, help="input JSONL file (default: stdin)")
+    parser.add_argument("-o", "--output", default=None, help="output JSONL file (default: stdout)")
+    parser.add_argument("-e", "--exclude", action="append", default=None, dest="excludes", help="e.g. children.id")
+    parser.add_argument("--workers", type=positive_int, default=1)
+    parser.add_argument("--chunk-size", type=positive_int, default=1000)
+    parser.add_argument("--unordered", action="store_false", dest="ordered")
+    parser.add_argument("--mmap", action="store_true", help="mmap the input file, and shard it by byte ranges")
+    parser.add_argument("--index", default=None, help="persisted line offset index (with --mmap)")
+    parser.add_argument("--shard-size", type=positive_int, default=16 * 1024 * 1024,
+                        help="bytes per shard (with --mmap)")
+    args = parser.parse_args(argv)
+
+    if args.mmap:
+        if not args.input:
+            parser.error("--mmap requires --input")
+        from .jsonl import map_file
+        out = open(args.output, "w") if args.output else sys.stdout
+        try:
+            map_file(import_symbol(args.mapper)(excludes=args.excludes), args.input, out,
+                     workers=args.workers,
+                     shard_size=args.shard_size,
+                     index_path=args.index)
+        finally:
+            if args.output:
+                out.close()
+        return
+
+    inp = open(args.input) if args.input else sys.stdin
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        run(args.mapper, inp, out,
+            excludes=args.excludes,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            ordered=args.ordered)
+    finally:
+        if args.input:
+            inp.close()
+        if args.output:
+            out.close()
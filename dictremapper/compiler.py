@@ -0,0 +1,424 @@
+# -*- coding:utf-8 -*-
+import json
+from json.encoder import encode_basestring_ascii
+from . import (
+    Remapper,
+    Path,
+    Composed,
+    Aggregate,
+    ChangeOrder,
+    LazyMapperCallable,
+    MissingKeyError,
+    STREAM,
+    Frame,
+    LRU,
+    _class_lock,
+    marker,
+)
+
+
+def is_plain_remapper(cls):
+    return (
+        cls.__call__ is Remapper.__call__ and
+        cls.as_dict is Remapper.as_dict and
+        cls.as_list is Remapper.as_list and
+        cls.get_current_excludes_dict is Remapper.get_current_excludes_dict
+    )
+
+
+def is_batched(cls, many, excludes):
+    # batch_callback needs whole list, so the mapper is called as is (as_list)
+    return many and many != STREAM and cls.get_plan(excludes).batched
+
+
+def missing(path, data, name):
+    return MissingKeyError(path.keys, data, (name, ))
+
+
+# nested compiled functions raise MissingKeyError with fields relative to them, the caller prepends its field
+def prefixing(fn, name):
+    def call(*args):
+        try:
+            return fn(*args)
+        except MissingKeyError as e:
+            e.fields = (name, ) + e.fields
+            raise
+    return call
+
+
+def stream(fn, dataset, name):
+    try:
+        for data in dataset:
+            yield fn(data)
+    except MissingKeyError as e:
+        e.fields = (name, ) + e.fields
+        raise
+
+
+_building = set()
+
+
+def compile_remapper(cls, excludes, json=False):
+    # json=True: the function writes JSON text (with w, e.g. list.append) instead of building dict
+    attr = "_compiled_json" if json else "_compiled"
+    fn = cls.__dict__.get(attr, {}).get(excludes)  # excludes is hash-consed ExcludeTrie
+    if fn is not None:
+        return fn
+    with _class_lock:  # reentrant, nested mappers are compiled while building
+        cache = cls.__dict__.get(attr)
+        if cache is None:
+            cache = LRU(256)
+            setattr(cls, attr, cache)
+        fn = cache.get(excludes)
+        if fn is None:
+            if (cls, excludes, json) in _building:  # cyclic nesting, resolved after building
+                return Deferred(cls, excludes, json)
+            _building.add((cls, excludes, json))
+            try:
+                fn = cache[excludes] = (JSONCompiler if json else Compiler)(cls, excludes).build()
+            finally:
+                _building.discard((cls, excludes, json))
+        return fn
+
+
+class Deferred(object):
+    def __init__(self, cls, excludes, json):
+        self.cls = cls
+        self.excludes = excludes
+        self.json = json
+        self.fn = None
+
+    def __call__(self, *args):
+        fn = self.fn
+        if fn is None:
+            fn = self.fn = compile_remapper(self.cls, self.excludes, json=self.json)
+        return fn(*args)
+
+
+WRITTEN = object()
+
+
+def encode(v, dumps=json.dumps):
+    # same as json.dumps(v)
+    t = type(v)
+    if t is str:
+        return encode_basestring_ascii(v)
+    elif t is int:
+        return int.__repr__(v)
+    elif v is None:
+        return "null"
+    elif v is True:
+        return "true"
+    elif v is False:
+        return "false"
+    return dumps(v)
+
+
+def dump_many(fn, dataset, w):
+    w("[")
+    first = True
+    for data in dataset:
+        if first:
+            first = False
+        else:
+            w(", ")
+        fn(data, w)
+    w("]")
+    return WRITTEN
+
+
+class LazyTarget(object):
+    def __init__(self, lazy, cls, name, excludes, json=False):
+        self.lazy = lazy
+        self.cls = cls
+        self.name = name
+        self.excludes = excludes
+        self.json = json
+        self.fn = None
+
+    def __call__(self, *args):
+        fn = self.fn
+        if fn is None:
+            fn = self.fn = self.resolve()
+        return fn(*args)
+
+    def resolve(self):
+        lazy = self.lazy
+        wrapper = lazy.resolve(self.cls)
+        target = self.cls if wrapper is None else wrapper.__class__
+
+        excludes = lazy.excludes.merge(self.excludes)
+        if not is_plain_remapper(target) or is_batched(target, lazy.many, excludes):
+            frame = Frame(name=self.name, remapper=new_instance(self.cls), excludes=self.excludes)
+            if self.json:  # a new stack for each call (the stack is changed while remapping)
+                return lambda data, w: w(encode(lazy(data, [frame]))) or WRITTEN
+            return lambda data: lazy(data, [frame])
+
+        fn = compile_remapper(target, excludes, json=self.json)
+        if self.json:
+            return prefixing((lambda data, w: dump_many(fn, data, w)) if lazy.many else fn, self.name)
+        elif lazy.many == STREAM:
+            return lambda dataset: stream(fn, dataset, self.name)
+        elif lazy.many:
+            return prefixing(lambda dataset: [fn(data) for data in dataset], self.name)
+        return prefixing(fn, self.name)
+
+
+def new_instance(cls):
+    instance = cls.__new__(cls)
+    Remapper.__init__(instance)
+    return instance
+
+
+class Compiler(object):
+    def __init__(self, cls, excludes, share=True):
+        self.cls = cls
+        self.excludes = excludes
+        self.share = share
+        self.env = {"_dict": cls.dict, "_missing": missing, "_Frame": Frame, "_MissingKeyError": MissingKeyError,
+                    "_stream": stream}
+        self.lines = []
+        self.i = 0
+        self._instance = None
+
+    @property
+    def instance(self):
+        if self._instance is None:
+            self._instance = new_instance(self.cls)
+        return self._instance
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def const(self, value, prefix="c"):
+        name = "_{}{}".format(prefix, len(self.env))
+        self.env[name] = value
+        return name
+
+    def var(self):
+        self.i += 1
+        return "v{}".format(self.i)
+
+    args = "data"
+
+    def build(self):
+        cls = self.cls
+        plan = cls.get_plan(self.excludes)
+
+        fnname = "remap_{}".format(cls.__name__)
+        self.emit(0, "def {}(data):".format(fnname))
+        self.emit(1, "d = _dict()")
+        values = self.prefetch(plan.prefixes if self.share else [])
+        for i, (name, path, excludes) in enumerate(plan.fields):
+            if self.share and i in plan.shared:
+                v = self.shared_value(path, values, plan.shared[i], (name, excludes), 1)
+            else:
+                v = self.value(path, "data", (name, excludes), 1)
+            self.emit(1, "d[{!r}] = {}".format(name, v))
+        for name, path in plan.aggregates:
+            fn = path.callback if type(path) is Aggregate else path
+            self.emit(1, "d[{!r}] = {}(d)".format(name, self.const(fn, "a")))
+        if plan.aggregates and plan.names is not None:
+            self.emit(1, "return _dict([{}])".format(", ".join("({0!r}, d[{0!r}])".format(name) for name in plan.names)))
+        else:
+            self.emit(1, "return d")
+        return self.define(fnname)
+
+    def define(self, fnname):
+        source = "\n".join(self.lines) + "\n"
+        code = compile(source, "<dictremapper.compiled {}>".format(self.cls.__name__), "exec")
+        exec(code, self.env)
+        fn = self.env[fnname]
+        fn.source = source
+        return fn
+
+    def stack(self, frame):
+        name, excludes = frame
+        return "[_Frame({!r}, {}, {})]".format(name, self.const(self.instance, "i"), self.const(excludes, "e"))
+
+    def value(self, path, data, frame, indent):
+        while isinstance(path, ChangeOrder):
+            path = path.path
+        if type(path) is Path and path.access_mode == "item" and all(hasattr(k, "endswith") for k in path.keys):
+            return self.path_value(path, data, frame, indent)
+        v = self.var()
+        if type(path) is Composed:
+            args = [self.value(x, data, frame, indent) for x in path.xs]
+            self.emit(indent, "{} = {}({})".format(v, self.const(path.callback, "f"), ", ".join(args)))
+        else:
+            self.emit(indent, "{} = {}({}, {})".format(v, self.const(path, "p"), data, self.stack(frame)))
+        return v
+
+    def prefetch(self, prefixes):
+        # shared intermediate objects are looked up once. if some of them are missing, the record is remapped by
+        # the function which doesn't share them (handling defaults per field)
+        values = ["data"]
+        if not prefixes:
+            return values
+        fallback = self.const(self.__class__(self.cls, self.excludes, share=False).build(), "fallback")
+        self.emit(1, "try:")
+        for parent, chain in prefixes:
+            p = "p{}".format(len(values))
+            self.emit(2, "{} = {}".format(p, chain_expr(chain, values[parent])))
+            values.append(p)
+        self.emit(1, "except KeyError:")
+        self.emit(2, "return {}({})".format(fallback, self.args))
+        return values
+
+    def shared_value(self, path, values, shared, frame, indent):
+        while isinstance(path, ChangeOrder):
+            path = path.path
+        index, chain, rest, fanout = shared
+        src = values[index]
+        expr = chain_expr(chain, src)
+        if fanout:
+            expr = "[{} for x0 in {}]".format(access_expr(rest, "x0", 1), expr)
+
+        v = self.var()
+        if expr != src:
+            self.accessing(path, v, expr, "data", frame, indent)
+            return v
+        self.emit(indent, "{} = {}".format(v, src))
+        if path.callback is not None:
+            self.convert(path.callback, v, frame, indent)
+        return v
+
+    def path_value(self, path, data, frame, indent):
+        v = self.var()
+        self.accessing(path, v, access_expr(path.keys, data, 0), data, frame, indent)
+        return v
+
+    def accessing(self, path, v, expr, data, frame, indent):
+        self.emit(indent, "try:")
+        self.emit(indent + 1, "{} = {}".format(v, expr))
+        self.emit(indent, "except KeyError:")
+        self.missing(path, v, data, frame, indent + 1)
+        callback = path.callback
+        if callback is not None:
+            self.emit(indent, "else:")
+            self.convert(callback, v, frame, indent + 1)
+
+    def convert(self, callback, v, frame, indent):
+        expr = self.callback_expr(callback, v, frame)
+        if not self.is_compiled_call(callback, frame[1]):
+            self.emit(indent, "{} = {}".format(v, expr))
+            return
+        self.emit(indent, "try:")
+        self.emit(indent + 1, "{} = {}".format(v, expr))
+        self.emit(indent, "except _MissingKeyError as e:")
+        self.emit(indent + 1, "e.fields = ({!r}, ) + e.fields".format(frame[0]))
+        self.emit(indent + 1, "raise")
+
+    def is_compiled_call(self, callback, excludes):
+        # LazyTarget and streams prepend the field by themselves
+        return isinstance(callback, Remapper) and is_plain_remapper(callback.__class__) and callback.many != STREAM and (
+            not is_batched(callback.__class__, callback.many, callback.excludes.merge(excludes))
+        )
+
+    def missing(self, path, v, data, frame, indent):
+        if path.default is marker:
+            self.emit(indent, "raise _missing({}, {}, {!r})".format(self.const(path, "p"), data, frame[0]))
+        else:
+            self.emit(indent, "{} = {}".format(v, self.const(path.default, "d")))
+
+    def callback_expr(self, callback, v, frame):
+        name, excludes = frame
+        if isinstance(callback, Remapper) and is_plain_remapper(callback.__class__) and not is_batched(
+            callback.__class__, callback.many, callback.excludes.merge(excludes)
+        ):
+            fn = self.const(compile_remapper(callback.__class__, callback.excludes.merge(excludes)), "n")
+            if callback.many == STREAM:
+                return "_stream({}, {}, {!r})".format(fn, v, name)
+            elif callback.many:
+                return "[{}(x) for x in {}]".format(fn, v)
+            return "{}({})".format(fn, v)
+        elif type(callback) is LazyMapperCallable:
+            return "{}({})".format(self.const(LazyTarget(callback, self.cls, name, excludes), "l"), v)
+        elif hasattr(callback, "many"):
+            return "{}({}, stack={})".format(self.const(callback, "f"), v, self.stack(frame))
+        else:
+            return "{}({})".format(self.const(callback, "f"), v)
+
+
+def chain_expr(chain, data):
+    return data + "".join("[{!r}]".format(k) for k in chain)
+
+
+def access_expr(keys, data, depth):
+    expr = data
+    for i, k in enumerate(keys):
+        if k.endswith("[]"):
+            x = "x{}".format(depth)
+            return "[{} for {} in {}[{!r}]]".format(access_expr(keys[i + 1:], x, depth + 1), x, expr, k[:-2])
+        elif k.isdigit():
+            expr = "{}[{}]".format(expr, int(k))
+        else:
+            expr = "{}[{!r}]".format(expr, k)
+    return expr
+
+
+class JSONCompiler(Compiler):
+    # generates dump_<class>(data, w), writing the same text as json.dumps(remap_<class>(data))
+    args = "data, w"
+
+    def __init__(self, cls, excludes, share=True):
+        super(JSONCompiler, self).__init__(cls, excludes, share=share)
+        self.env.update({"_enc": encode, "_W": WRITTEN, "_dump_many": dump_many})
+        self.writing = False
+
+    def build(self):
+        cls = self.cls
+        plan = cls.get_plan(self.excludes)
+
+        fnname = "dump_{}".format(cls.__name__)
+        self.emit(0, "def {}(data, w):".format(fnname))
+        if plan.aggregates:  # needs dict
+            self.emit(1, "w(_enc({}(data)))".format(self.const(compile_remapper(cls, self.excludes), "n")))
+            self.emit(1, "return _W")
+            return self.define(fnname)
+
+        values = self.prefetch(plan.prefixes if self.share else [])
+        for i, (name, path, excludes) in enumerate(plan.fields):
+            self.emit(1, "w({!r})".format(("{" if i == 0 else ", ") + json.dumps(name) + ": "))
+            self.writing = writing = self.is_writing(path, excludes)
+            if self.share and i in plan.shared:
+                v = self.shared_value(path, values, plan.shared[i], (name, excludes), 1)
+            else:
+                v = self.value(path, "data", (name, excludes), 1)
+            self.writing = False
+            if writing:
+                self.emit(1, "if {} is not _W:".format(v))
+                self.emit(2, "w(_enc({}))".format(v))
+            else:
+                self.emit(1, "w(_enc({}))".format(v))
+        self.emit(1, "w({!r})".format("}" if plan.fields else "{}"))
+        self.emit(1, "return _W")
+        return self.define(fnname)
+
+    def is_writing(self, path, excludes):
+        while isinstance(path, ChangeOrder):
+            path = path.path
+        if type(path) is not Path:
+            return False
+        callback = path.callback
+        return type(callback) is LazyMapperCallable or (
+            isinstance(callback, Remapper) and is_plain_remapper(callback.__class__) and not is_batched(
+                callback.__class__, callback.many, callback.excludes.merge(excludes)
+            )
+        )
+
+    def is_compiled_call(self, callback, excludes):
+        if self.writing:
+            return type(callback) is not LazyMapperCallable
+        return super(JSONCompiler, self).is_compiled_call(callback, excludes)
+
+    def callback_expr(self, callback, v, frame):
+        if not self.writing:
+            return super(JSONCompiler, self).callback_expr(callback, v, frame)
+        name, excludes = frame
+        if type(callback) is LazyMapperCallable:
+            return "{}({}, w)".format(self.const(LazyTarget(callback, self.cls, name, excludes, json=True), "l"), v)
+        fn = self.const(compile_remapper(callback.__class__, callback.excludes.merge(excludes), json=True), "n")
+        if callback.many:
+            return "_dump_many({}, {}, w)".format(fn, v)
+        return "{}({}, w)".format(fn, v)
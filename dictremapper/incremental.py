@@ -0,0 +1,170 @@
+# -*- coding:utf-8 -*-
+from . import (
+    Remapper,
+    Path,
+    Composed,
+    ChangeOrder,
+    LazyMapperCallable,
+    STREAM,
+    Frame,
+    maybe_list,
+)
+from .compiler import is_plain_remapper
+
+ANY = object()  # fanned out index
+
+
+def source_pattern(keys):  # e.g. ["tags[]", "name"] -> ("tags", ANY, "name")
+    pattern = []
+    for k in keys:
+        if not hasattr(k, "endswith"):
+            return None
+        elif k.endswith("[]"):
+            pattern.append(k[:-2])
+            pattern.append(ANY)
+        else:
+            pattern.append(k)
+    return tuple(pattern)
+
+
+def field_spec(name, path, excludes):
+    # (name, path, excludes, source patterns (None: depends on the whole data), nested remapper or None)
+    while isinstance(path, ChangeOrder):
+        path = path.path
+    if type(path) is Composed:
+        patterns = []
+        for x in path.xs:
+            _, _, _, xs, _ = field_spec(name, x, excludes)
+            if xs is None:
+                return (name, path, excludes, None, None)
+            patterns.extend(xs)
+        return (name, path, excludes, patterns, None)
+    elif type(path) is not Path:
+        return (name, path, excludes, None, None)
+
+    pattern = source_pattern(path.keys)
+    if pattern is None:
+        return (name, path, excludes, None, None)
+    callback = path.callback
+    nested = None
+    if ANY not in pattern and (type(callback) is LazyMapperCallable or isinstance(callback, Remapper)):
+        if callback.many != STREAM:
+            nested = callback
+    return (name, path, excludes, [pattern], nested)
+
+
+def get_specs(plan):
+    specs = plan.__dict__.get("incremental_specs")
+    if specs is None:
+        specs = plan.incremental_specs = [field_spec(name, path, excludes) for name, path, excludes in plan.fields]
+    return specs
+
+
+def match(pattern, changed):
+    for p, c in zip(pattern, changed):
+        if p is not ANY and p != c:
+            return False
+    return True
+
+
+def update(mapper, old, changes, data, excludes_dict, stack):
+    # recomputes fields depending on changes (paths in the new data), the others are taken from old
+    if not is_plain_remapper(mapper.__class__) or not isinstance(old, dict):
+        return mapper.as_dict(data, stack, excludes_dict)
+
+    plan = mapper.get_plan(excludes_dict)
+    d = mapper.dict(old)
+    touched = set()
+    for name, path, excludes, patterns, nested in get_specs(plan):
+        full = False
+        rests = []
+        for changed in changes:
+            if patterns is None:
+                full = True
+                break
+            for pattern in patterns:
+                if match(pattern, changed):
+                    if nested is None or len(changed) <= len(pattern):
+                        full = True
+                        break
+                    rests.append(changed[len(pattern):])
+            if full:
+                break
+        if not full and not rests:
+            continue
+
+        touched.add(name)
+        if name not in old:  # tmpstate, computed if some aggregate needs it
+            continue
+        stack.append(Frame(name=name, remapper=mapper, excludes=excludes))
+        try:
+            if full:
+                d[name] = path(data, stack)
+            else:
+                d[name] = update_nested(mapper, nested, old[name], rests, path, data, excludes, stack)
+        finally:
+            stack.pop()
+
+    if touched and plan.aggregates:
+        aggregates = []
+        for name, path in plan.aggregates:
+            depends = getattr(path, "depends", None)
+            if name not in old or depends is None or touched.intersection(depends):
+                aggregates.append((name, path))
+                touched.add(name)
+        if aggregates:
+            for name, path, excludes in plan.fields:
+                if name not in d:
+                    stack.append(Frame(name=name, remapper=mapper, excludes=excludes))
+                    d[name] = path(data, stack)
+                    stack.pop()
+            for name, path in aggregates:
+                d[name] = path(d)
+            if plan.names is not None:
+                d = mapper.dict([(name, d[name]) for name in plan.names])
+    return d
+
+
+def update_nested(mapper, callback, old, rests, path, data, excludes, stack):
+    try:
+        value = path.accessor(data)
+    except KeyError:
+        return path(data, stack)
+    if type(callback) is LazyMapperCallable:
+        target = callback.get_target(mapper)
+    else:
+        target = callback
+    excludes_dict = callback.excludes.merge(excludes)
+    if not callback.many:
+        return update(target, old, rests, value, excludes_dict, stack)
+    return update_many(target, old, rests, value, excludes_dict, stack)
+
+
+def update_many(mapper, old, changes, dataset, excludes_dict, stack):
+    if not isinstance(old, list) or len(old) != len(dataset):
+        return mapper.as_list(dataset, stack, excludes_dict)
+    grouped = {}
+    for changed in changes:
+        if not changed or not changed[0].isdigit() or int(changed[0]) >= len(old):
+            return mapper.as_list(dataset, stack, excludes_dict)
+        grouped.setdefault(int(changed[0]), []).append(changed[1:])
+    result = list(old)
+    for i, rests in grouped.items():
+        if any(not rest for rest in rests):
+            result[i] = mapper.as_dict(dataset[i], stack, excludes_dict)
+        else:
+            result[i] = update(mapper, old[i], rests, dataset[i], excludes_dict, stack)
+    return result
+
+
+def remap_incremental(mapper, old, changed_paths, data):
+    changes = [tuple(str(k) for k in maybe_list(changed)) for changed in changed_paths]
+    stack = mapper.new_stack()
+    excludes_dict = mapper.excludes.data
+    if any(not changed for changed in changes):  # the whole data is changed
+        return mapper(data)
+    elif mapper.many == STREAM:
+        return mapper(data)
+    elif mapper.many:
+        return update_many(mapper, old, changes, data, excludes_dict, stack)
+    return update(mapper, old, changes, data, excludes_dict, stack)
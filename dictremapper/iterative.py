@@ -0,0 +1,138 @@
+# -*- coding:utf-8 -*-
+from . import (
+    Remapper,
+    Path,
+    ChangeOrder,
+    LazyMapperCallable,
+    STREAM,
+    Frame,
+    marker,
+)
+from .compiler import is_plain_remapper
+
+
+class MaxDepthExceeded(RuntimeError):
+    pass
+
+
+_RECORD = 0
+_FINISH = 1
+
+
+_SIMPLE = 0  # plain value (or callback)
+_CALL = 1  # called recursively (e.g. Composed, not plain remappers)
+_NESTED = 2  # pushed onto the work stack
+
+
+def field_spec(name, path, mapper, excludes):
+    # (name, kind, path, frame, nested remapper (None: the mapper itself), many, excludes of nested remapper)
+    frame = Frame(name=name, remapper=mapper, excludes=excludes)
+    while isinstance(path, ChangeOrder):
+        path = path.path
+    if type(path) is not Path:
+        return (name, _CALL, path, frame, None, None, None)
+    callback = path.callback
+    if callback is None or not hasattr(callback, "many"):
+        return (name, _SIMPLE, path, frame, None, None, None)
+
+    if type(callback) is LazyMapperCallable:
+        fn = callback.get_target(mapper)
+    elif isinstance(callback, Remapper):
+        fn = callback
+    else:
+        fn = None
+    if fn is None or callback.many == STREAM or not is_plain_remapper(fn.__class__):
+        return (name, _CALL, path, frame, None, None, None)
+    child_excludes = callback.excludes.merge(excludes)
+    if callback.many and fn.get_plan(child_excludes).batched:  # batch_callback needs whole list
+        return (name, _CALL, path, frame, None, None, None)
+    return (name, _NESTED, path, frame, None if fn is mapper else fn, callback.many, child_excludes)
+
+
+def get_specs(plan, mapper):
+    specs = plan.__dict__.get("iterative_specs")
+    if specs is None:
+        specs = plan.iterative_specs = [field_spec(name, path, mapper, excludes) for name, path, excludes in plan.fields]
+    return specs
+
+
+def run(mapper, data, excludes_dict, max_depth=None):
+    # nested mappers (Path(..., callback=Mapper()), Self, LazyMapperCallable) are pushed onto a work stack,
+    # instead of calling them recursively. each record's dict is created with placeholders for nested values
+    # (to keep the order of fields), and finished (aggregates) after all of its children.
+    # each record has the frames of its ancestors (linked, see to_stack), so errors have the same fields as the
+    # recursive engine.
+    root = [None]
+    work = [(_RECORD, mapper, data, excludes_dict, root, 0, 0, None)]
+    push = work.append
+    pop = work.pop
+
+    while work:
+        item = pop()
+        if item[0] == _FINISH:
+            _, mapper, plan, d, container, key = item
+            for name, path in plan.aggregates:
+                d[name] = path(d)
+            if plan.names is not None:
+                d = mapper.dict([(name, d[name]) for name in plan.names])
+            container[key] = d
+            continue
+
+        _, mapper, data, excludes_dict, container, key, depth, frames = item
+        if max_depth is not None and depth > max_depth:
+            raise MaxDepthExceeded("max_depth={} is exceeded".format(max_depth))
+
+        plan = mapper.get_plan(excludes_dict)
+        d = mapper.dict()
+        if plan.aggregates:
+            push((_FINISH, mapper, plan, d, container, key))
+        else:
+            container[key] = d
+
+        children = []
+        for name, kind, path, frame, fn, many, child_excludes in get_specs(plan, mapper):
+            if kind == _SIMPLE:  # same as path(data, stack), the stack is needed only for errors
+                try:
+                    value = path.accessor(data)
+                except KeyError:
+                    if path.default is marker:
+                        path.on_missing(data, to_stack(frames, frame))
+                    value = path.default
+                else:
+                    if path.callback is not None:
+                        value = path.callback(value)
+                d[name] = value
+                continue
+            elif kind == _CALL:
+                d[name] = path(data, to_stack(frames, frame))
+                continue
+
+            try:
+                value = path.accessor(data)
+            except KeyError:
+                if path.default is marker:
+                    path.on_missing(data, to_stack(frames, frame))
+                d[name] = path.default
+                continue
+            fn = fn or mapper
+            subframes = (frames, frame)
+            if many:
+                value = list(value)
+                d[name] = subcontainer = [None] * len(value)
+                for i, subdata in enumerate(value):
+                    children.append((_RECORD, fn, subdata, child_excludes, subcontainer, i, depth + 1, subframes))
+            else:
+                d[name] = None
+                children.append((_RECORD, fn, value, child_excludes, d, name, depth + 1, subframes))
+        children.reverse()
+        work.extend(children)
+    return root[0]
+
+
+def to_stack(frames, frame):  # e.g. ((None, f0), f1), f2 -> [f0, f1, f2]
+    stack = [frame]
+    while frames is not None:
+        frames, parent = frames
+        stack.append(parent)
+    stack.reverse()
+    return stack
@@ -0,0 +1,132 @@
+# -*- coding:utf-8 -*-
+import json
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+
+# remapping a large JSONL file with worker processes. the file is mmap-ed by each worker,
+# and only byte ranges (shards) are sent to them.
+
+
+def open_mmap(path):
+    with open(path, "rb") as rf:
+        if os.fstat(rf.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_index(path):
+    # offsets of each line's head, and the size of the file (at the end)
+    offsets = array("q")
+    mm = open_mmap(path)
+    if mm is None:
+        offsets.append(0)
+        return offsets
+    with mm:
+        size = len(mm)
+        find = mm.find
+        append = offsets.append
+        pos = 0
+        while pos < size:
+            append(pos)
+            pos = find(b"\n", pos)
+            if pos < 0:
+                break
+            pos += 1
+        offsets.append(size)
+    return offsets
+
+
+def stamp(path):
+    st = os.stat(path)
+    return array("q", [st.st_size, st.st_mtime_ns])
+
+
+def load_index(path, index_path=None):
+    # with index_path, the index is persisted (and rebuilt when the file is changed)
+    if index_path is None:
+        return build_index(path)
+    header = stamp(path)
+    try:
+        with open(index_path, "rb") as rf:
+            data = array("q")
+            data.frombytes(rf.read())
+        if data[:2] == header and len(data) > 2 and data[-1] == header[0]:  # not truncated, ends with the size
+            return data[2:]
+    except (IOError, OSError, ValueError):  # ValueError: truncated in the middle of an item
+        pass
+    offsets = build_index(path)
+    with open(index_path, "wb") as wf:
+        (header + offsets).tofile(wf)
+    return offsets
+
+
+def split(offsets, shard_size):
+    # [(start, end)], byte ranges aligned at line boundaries
+    if shard_size <= 0:
+        raise ValueError("shard_size must be positive, got {!r}".format(shard_size))
+    shards = []
+    start = offsets[0]
+    end = offsets[-1]
+    while start < end:
+        i = bisect_left(offsets, start + shard_size)
+        stop = end if i >= len(offsets) else offsets[i]
+        shards.append((start, stop))
+        start = stop
+    return shards
+
+
+def remap_range(mm, start, end, dump):
+    parts = []
+    w = parts.append
+    find = mm.find
+    loads = json.loads
+    pos = start
+    while pos < end:
+        eol = find(b"\n", pos, end)
+        if eol < 0:
+            eol = end
+        line = mm[pos:eol]
+        if line.strip():
+            dump(loads(line), w)
+            w("\n")
+        pos = eol + 1
+    return "".join(parts)
+
+
+_state = {}
+
+
+def init_worker(mapper, path):
+    _state["dump"] = mapper.get_dumper()
+    _state["mmap"] = open_mmap(path)
+
+
+def remap_shard(shard):
+    return remap_range(_state["mmap"], shard[0], shard[1], _state["dump"])
+
+
+def map_file(mapper, path, out, workers=None, shard_size=16 * 1024 * 1024, index_path=None):
+    # the output is written in the original order
+    offsets = load_index(path, index_path=index_path)
+    shards = split(offsets, shard_size)
+    if workers == 1 or len(shards) <= 1:
+        init_worker(mapper, path)
+        try:
+            for shard in shards:
+                out.write(remap_shard(shard))
+        finally:
+            mm = _state.pop("mmap")
+            if mm is not None:
+                mm.close()
+        return
+
+    from multiprocessing import Pool
+    pool = Pool(workers, initializer=init_worker, initargs=(mapper, path))
+    try:
+        for text in pool.imap(remap_shard, shards):
+            out.write(text)
+    finally:
+        pool.close()
+        pool.join()
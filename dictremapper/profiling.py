@@ -0,0 +1,105 @@
+# -*- coding:utf-8 -*-
+import time
+from collections import OrderedDict
+
+
+class FieldStats(object):
+    __slots__ = ("calls", "total", "self", "defaults", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self = 0.0
+        self.defaults = 0
+        self.errors = 0
+
+
+def frame_key(frame):
+    return "{}.{}".format(frame.remapper.__class__.__name__, frame.name)
+
+
+class Profiler(object):
+    def __init__(self, timer=time.perf_counter):
+        self.timer = timer
+        self.stats = OrderedDict()  # tuple of "<remapper class>.<field>" -> FieldStats
+
+    def stack(self):
+        return ProfilingStack(self)
+
+    def get_stats(self, stack):
+        key = tuple(frame_key(frame) for frame in stack)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = FieldStats()
+        return stats
+
+    def clear(self):
+        self.stats.clear()
+
+    def report(self):
+        rows = []
+        for key, stats in self.stats.items():
+            rows.append(OrderedDict([
+                ("field", ".".join(k.rsplit(".", 1)[-1] for k in key)),
+                ("stack", ";".join(key)),
+                ("depth", len(key)),
+                ("calls", stats.calls),
+                ("total", stats.total),
+                ("self", stats.self),
+                ("defaults", stats.defaults),
+                ("errors", stats.errors),
+            ]))
+        rows.sort(key=lambda row: row["total"], reverse=True)
+        return rows
+
+    def dump_report(self, fp):
+        fmt = "{:>8} {:>12} {:>12} {:>8} {:>8} {:>5}  {}\n"
+        fp.write(fmt.format("calls", "total(ms)", "self(ms)", "defaults", "errors", "depth", "field"))
+        for row in self.report():
+            fp.write(fmt.format(
+                row["calls"], "{:.3f}".format(row["total"] * 1000), "{:.3f}".format(row["self"] * 1000),
+                row["defaults"], row["errors"], row["depth"], row["field"]
+            ))
+
+    def dump_folded(self, fp):
+        # flamegraph.pl compatible (self time, in microseconds)
+        for key, stats in self.stats.items():
+            fp.write("{} {}\n".format(";".join(key), int(stats.self * 1000000)))
+
+
+class ProfilingStack(list):
+    # Remapper.as_dict pushes a Frame for each field, so fields are timed between append() and pop()
+    def __init__(self, profiler, frames=()):
+        super(ProfilingStack, self).__init__(frames)
+        self.profiler = profiler
+        self.timer = profiler.timer
+        self.started = [self.timer()] * len(self)
+        self.children = [0.0] * len(self)
+
+    def __copy__(self):
+        stack = ProfilingStack(self.profiler, self)
+        if hasattr(self, "memo"):
+            stack.memo = self.memo
+        return stack
+
+    def append(self, frame):
+        super(ProfilingStack, self).append(frame)
+        self.children.append(0.0)
+        self.started.append(self.timer())
+
+    def pop(self):
+        elapsed = self.timer() - self.started.pop()
+        children = self.children.pop()
+        stats = self.profiler.get_stats(self)
+        stats.calls += 1
+        stats.total += elapsed
+        stats.self += elapsed - children
+        if self.children:
+            self.children[-1] += elapsed
+        return super(ProfilingStack, self).pop()
+
+    def on_default(self, path):
+        self.profiler.get_stats(self).defaults += 1
+
+    def on_missing(self, path):
+        self.profiler.get_stats(self).errors += 1
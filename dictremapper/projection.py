@@ -0,0 +1,261 @@
+# -*- coding:utf-8 -*-
+import json
+import re
+from json.decoder import JSONDecodeError, scanstring
+from . import (
+    Path,
+    Composed,
+    ChangeOrder,
+    Remapper,
+    Shortcut,
+    LazyMapperCallable,
+    _class_lock,
+    marker,
+)
+from .compiler import is_plain_remapper
+
+# projection: the part of the input which a mapper reads.
+#   {key: projection} for objects (for arrays, applied to each element. digit keys select elements),
+#   None for the whole value. {EACH: projection} applies the projection to each element of an array
+#   (e.g. records of many=True, see each()).
+# mappers' projections are for a record (also with many=True).
+# recursive mappers (e.g. Self) make cyclic projections.
+
+EACH = "[]"
+
+
+def each(projection):
+    # for a list of records (many=True). digit keys of the record's projection are not indexes of the list
+    return {EACH: projection}
+
+
+def get_projection(cls, excludes):
+    plan = cls.get_plan(excludes)
+    projection = plan.__dict__.get("projection", marker)
+    if projection is marker:
+        with _class_lock:
+            projection = plan.projection = Builder().build(cls, excludes)
+    return projection
+
+
+class Builder(object):
+    def __init__(self):
+        self.nodes = {}  # (mapper class, excludes) -> projection
+        self.whole = set()  # id of projections, which need the whole value
+
+    def build(self, cls, excludes):
+        root = self.mapper(cls, excludes)
+        if not self.whole:
+            return root
+        return self.replace_whole(root, set())
+
+    def replace_whole(self, node, seen):
+        if node is None or id(node) in self.whole:
+            return None
+        if id(node) not in seen:
+            seen.add(id(node))
+            for k, sub in node.items():
+                node[k] = self.replace_whole(sub, seen)
+        return node
+
+    def mapper(self, cls, excludes):
+        key = (cls, excludes)
+        node = self.nodes.get(key)
+        if node is not None:
+            return node
+        node = self.nodes[key] = {}
+        if not is_plain_remapper(cls):
+            self.whole.add(id(node))
+            return node
+        for name, path, field_excludes in cls.get_plan(excludes).fields:
+            self.field(node, cls, name, path, field_excludes)
+        return node
+
+    def field(self, node, cls, name, path, excludes):
+        while isinstance(path, ChangeOrder):
+            path = path.path
+        if type(path) is Composed:
+            for x in path.xs:
+                self.field(node, cls, name, x, excludes)
+        elif type(path) is Path and path.access_mode == "item" and all(hasattr(k, "endswith") for k in path.keys):
+            add(node, path.keys, self.callback(path.callback, cls, excludes))
+        else:
+            self.whole.add(id(node))
+
+    def callback(self, callback, cls, excludes):
+        if type(callback) is LazyMapperCallable:
+            wrapper = callback.resolve(cls)
+            target = cls if wrapper is None else wrapper.__class__
+            return self.mapper(target, callback.excludes.merge(excludes))
+        elif isinstance(callback, Remapper):
+            return self.mapper(callback.__class__, callback.excludes.merge(excludes))
+        elif isinstance(callback, Shortcut):
+            return self.shortcut(callback)
+        return None  # the callback sees the whole value
+
+    def shortcut(self, shortcut):
+        if not all(hasattr(k, "endswith") for k in shortcut.keys):
+            return None
+        node = {}
+        remapper = shortcut.remapper
+        sub = self.mapper(remapper.__class__, remapper.excludes.data) if isinstance(remapper, Remapper) else None
+        if not shortcut.keys:
+            return sub
+        add(node, shortcut.keys, sub)
+        return node
+
+
+def add(node, keys, sub):
+    # merging into a shared (mapper's) projection only widens it, which is harmless
+    for k in keys[:-1]:
+        k = k[:-2] if k.endswith("[]") else k
+        child = node.get(k, marker)
+        if child is None:
+            return
+        elif child is marker:
+            child = node[k] = {}
+        node = child
+    if keys:
+        k = keys[-1]
+        k = k[:-2] if k.endswith("[]") else k
+        node[k] = merge(node.get(k, marker), sub, set())
+
+
+def merge(x, y, seen):
+    if x is marker or x is y:
+        return y
+    elif x is None or y is None:
+        return None
+    elif (id(x), id(y)) in seen:
+        return x
+    seen.add((id(x), id(y)))
+    for k, sub in y.items():
+        x[k] = merge(x.get(k, marker), sub, seen)
+    return x
+
+
+def iter_source_paths(projection, prefix, seen):
+    if projection is None:
+        yield prefix
+        return
+    if id(projection) in seen:  # recursive
+        return
+    seen = seen | {id(projection)}
+    for k, sub in projection.items():
+        for path in iter_source_paths(sub, "{}.{}".format(prefix, k) if prefix else k, seen):
+            yield path
+
+
+def source_paths(projection):
+    return sorted(set(iter_source_paths(projection, "", frozenset())))
+
+
+# projecting reader. only values in the projection are kept, the others are dropped as soon as they are scanned,
+# so the parsed payload never exists as a whole.
+_decoder = json.JSONDecoder()
+_scan_once = _decoder.scan_once
+WS = re.compile(r"[ \t\n\r]*")
+KEY = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')  # keys are short, and rarely escaped
+COLON = re.compile(r"[ \t\n\r]*:[ \t\n\r]*")
+DELIMITER = re.compile(r"[ \t\n\r]*([,}\]])[ \t\n\r]*")
+
+
+def loads(s, projection=None):
+    if not isinstance(s, str):
+        s = s.decode("utf-8")
+    if projection is None:
+        return json.loads(s)
+    try:
+        pos = WS.match(s, 0).end()
+        value, pos = decode(s, pos, projection)
+    except IndexError:
+        raise JSONDecodeError("Unexpected end of data", s, len(s))
+    pos = WS.match(s, pos).end()
+    if pos != len(s):
+        raise JSONDecodeError("Extra data", s, pos)
+    return value
+
+
+def decode(s, pos, projection):
+    if projection is not None:
+        c = s[pos]
+        if c == "{":
+            return decode_object(s, pos, projection)
+        elif c == "[":
+            return decode_array(s, pos, projection)
+    try:
+        return _scan_once(s, pos)
+    except StopIteration:
+        raise JSONDecodeError("Expecting value", s, pos)
+
+
+def decode_object(s, pos, projection):
+    d = {}
+    pos = WS.match(s, pos + 1).end()
+    if s[pos] == "}":
+        return d, pos + 1
+    key = KEY.match
+    delimiter = DELIMITER.match
+    while True:
+        m = key(s, pos)
+        if m is None:
+            if s[pos] != '"':
+                raise JSONDecodeError("Expecting property name enclosed in double quotes", s, pos)
+            k, pos = scanstring(s, pos + 1)
+            m = COLON.match(s, pos)
+            if m is None:
+                raise JSONDecodeError("Expecting ':' delimiter", s, pos)
+        else:
+            k = m.group(1)
+        pos = m.end()
+        sub = projection.get(k, marker)
+        if sub is marker:
+            pos = skip(s, pos)
+        else:
+            d[k], pos = decode(s, pos, sub)
+        m = delimiter(s, pos)
+        if m is None or m.group(1) == "]":
+            raise JSONDecodeError("Expecting ',' delimiter", s, pos)
+        elif m.group(1) == "}":
+            return d, m.end()
+        pos = m.end()
+
+
+def decode_array(s, pos, projection):
+    xs = []
+    every = projection.get(EACH, marker)
+    fanout = any(not k.isdigit() for k in projection)
+    pos = WS.match(s, pos + 1).end()
+    if s[pos] == "]":
+        return xs, pos + 1
+    delimiter = DELIMITER.match
+    i = 0
+    while True:
+        sub = projection.get(str(i), marker)
+        if every is not marker:
+            sub = every
+        elif sub is marker:
+            sub = projection if fanout else marker
+        elif fanout:
+            sub = None  # selected and fanned out
+        if sub is marker:
+            pos = skip(s, pos)
+            xs.append(None)  # keeps indexes
+        else:
+            x, pos = decode(s, pos, sub)
+            xs.append(x)
+        m = delimiter(s, pos)
+        if m is None or m.group(1) == "}":
+            raise JSONDecodeError("Expecting ',' delimiter", s, pos)
+        elif m.group(1) == "]":
+            return xs, m.end()
+        pos = m.end()
+        i += 1
+
+
+def skip(s, pos):
+    # json's scanner (C) is faster than skipping in python, and the value is dropped immediately
+    try:
+        return _scan_once(s, pos)[1]
+    except StopIteration:
+        raise JSONDecodeError("Expecting value", s, pos)
@@ -0,0 +1,138 @@
+# -*- coding:utf-8 -*-
+import unittest
+
+
+class Tests(unittest.TestCase):
+    def _getTargetClass(self):
+        from dictremapper.cache import ResultCache
+        return ResultCache
+
+    def _makeOne(self, *args, **kwargs):
+        return self._getTargetClass()(*args, **kwargs)
+
+    def _makeMapper(self, calls):
+        from dictremapper import Remapper, Path
+
+        class MyMapper(Remapper):
+            name = Path("name", callback=lambda x: calls.append(x) or x)
+            tags = Path("tags[].name", default=[])
+        return MyMapper
+
+    def test_it(self):
+        calls = []
+        cache = self._makeOne()
+        MyMapper = self._makeMapper(calls)
+        mapper = MyMapper(cache=cache)
+
+        d = {"name": "foo", "tags": [{"name": "a", "id": 1}], "unused": 1}
+        expected = MyMapper()(d)
+        del calls[:]
+
+        result = mapper(d)
+        self.assertEqual(result, expected)
+        result["name"] = "modified"
+        self.assertEqual(mapper({"name": "foo", "tags": [{"name": "a", "id": 2}], "unused": 2}), expected)
+        self.assertEqual(calls, ["foo"])
+
+        self.assertEqual(mapper({"name": "foo", "tags": [{"name": "b"}]})["tags"], ["b"])
+        self.assertEqual(mapper({"name": 1})["name"], 1)
+        self.assertEqual(mapper({"name": True})["name"], True)
+        self.assertEqual(MyMapper(cache=cache, excludes=["tags"])(d), {"name": "foo"})
+        self.assertEqual(MyMapper(cache=cache, many=True)([d, d]), [expected, expected])
+        self.assertEqual(calls, ["foo", "foo", 1, True, "foo", "foo", "foo"])
+        self.assertEqual(cache.cache_info()[:2], (1, 6))
+
+    def test_eviction(self):
+        calls = []
+        now = [0]
+        cache = self._makeOne(maxsize=2, ttl=10, timer=lambda: now[0])
+        mapper = self._makeMapper(calls)(cache=cache)
+
+        mapper({"name": "a"})
+        mapper({"name": "b"})
+        mapper({"name": "a"})
+        mapper({"name": "c"})  # "b" is evicted
+        mapper({"name": "a"})
+        mapper({"name": "b"})
+        self.assertEqual(calls, ["a", "b", "c", "b"])
+        self.assertEqual(cache.cache_info().evictions, 2)
+
+        now[0] = 20
+        mapper({"name": "b"})
+        self.assertEqual(calls, ["a", "b", "c", "b", "b"])
+
+    def test_shared(self):
+        import json
+        import pickle
+
+        cache = self._makeOne(copy=False)
+        mapper = self._makeMapper([])(cache=cache)
+        d = {"name": "foo", "tags": [{"name": "a"}]}
+        result = mapper(d)
+        self.assertIs(mapper(d), result)
+        with self.assertRaises(TypeError):
+            result["name"] = "bar"
+        with self.assertRaises(TypeError):
+            result["tags"].append("b")
+        self.assertEqual(json.loads(json.dumps(result)), result)
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+
+    def test_unhashable(self):
+        calls = []
+        mapper = self._makeMapper(calls)(cache=self._makeOne())
+        mapper({"name": {"x"}})
+        mapper({"name": {"x"}})
+        self.assertEqual(len(calls), 2)
+
+    def test_not_json_like(self):
+        from collections import OrderedDict
+        from dictremapper import Remapper, Path
+
+        class Row(object):
+            def __init__(self, name):
+                self.name = name
+
+        class RowMapper(Remapper):
+            access_mode = "attr"
+            name = Path("name")
+
+        mapper = RowMapper(cache=self._makeOne())
+        row = Row("a")
+        self.assertEqual(mapper(row), {"name": "a"})
+        row.name = "b"
+        self.assertEqual(mapper(row), {"name": "b"})
+
+        calls = []
+        mapper = self._makeMapper(calls)(cache=self._makeOne())
+        self.assertEqual(mapper({"name": [1, 2]}), {"name": [1, 2], "tags": []})
+        self.assertEqual(mapper({"name": (1, 2)}), {"name": (1, 2), "tags": []})
+        self.assertEqual(type(mapper({"name": (1, 2)})["name"]), tuple)
+        self.assertEqual(len(calls), 2)
+
+        class OrderedMapper(Remapper):
+            dict = OrderedDict
+            name = Path("name")
+
+        mapper = OrderedMapper(cache=self._makeOne())
+        self.assertEqual(type(mapper({"name": "a"})), OrderedDict)
+        self.assertEqual(type(mapper({"name": "a"})), OrderedDict)  # cached
+
+    def test_many_and_digit_keys(self):
+        from dictremapper import Remapper, Path
+
+        class Row(Remapper):
+            first = Path("0")
+
+        mapper = Row(many=True, cache=self._makeOne())
+        self.assertEqual(mapper([["a"], ["b"]]), [{"first": "a"}, {"first": "b"}])
+        self.assertEqual(mapper([["a"], ["c"]]), [{"first": "a"}, {"first": "c"}])
+        self.assertEqual(mapper([["a"], ["c"]]), [{"first": "a"}, {"first": "c"}])
+        self.assertEqual(mapper.cache.cache_info()[:2], (1, 2))
+
+        class NestedMapper(Remapper):
+            first = Path("a.0")
+
+        mapper = NestedMapper(cache=self._makeOne())
+        self.assertEqual(mapper({"a": {0: "one"}}), {"first": "one"})
+        self.assertEqual(mapper({"a": {0: "two"}}), {"first": "two"})
+        self.assertEqual(mapper({"a": ["three"]}), {"first": "three"})
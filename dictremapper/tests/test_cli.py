@@ -0,0 +1,48 @@
+# -*- coding:utf-8 -*-
+import unittest
+import json
+import os
+import tempfile
+from dictremapper import Remapper, Path
+
+
+class SummaryMapper(Remapper):  # workers import this by dotted path
+    name = Path("full_name")
+    url = Path("html_url")
+    star = Path("stargazers_count", default=0)
+
+
+class Tests(unittest.TestCase):
+    def _callFUT(self, argv):
+        from dictremapper.cli import main
+        return main(argv)
+
+    def _makeInput(self, n):
+        fp = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False)
+        self.addCleanup(os.unlink, fp.name)
+        with fp:
+            for i in range(n):
+                fp.write(json.dumps({"full_name": "yyyy{}".format(i), "html_url": "xxxx{}".format(i)}))
+                fp.write("\n")
+        return fp.name
+
+    def _run(self, n, *options):
+        inp = self._makeInput(n)
+        fd, out = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.unlink, out)
+        self._callFUT([__name__ + ".SummaryMapper", "-i", inp, "-o", out] + list(options))
+        with open(out) as rf:
+            return [json.loads(line) for line in rf]
+
+    def test_it(self):
+        result = self._run(3, "--exclude", "url")
+        self.assertEqual(result, [{"name": "yyyy0", "star": 0}, {"name": "yyyy1", "star": 0}, {"name": "yyyy2", "star": 0}])
+
+    def test_workers(self):
+        result = self._run(100, "--workers", "2", "--chunk-size", "7")
+        self.assertEqual([d["name"] for d in result], ["yyyy{}".format(i) for i in range(100)])
+
+    def test_workers__unordered(self):
+        result = self._run(100, "--workers", "2", "--chunk-size", "7", "--unordered")
+        self.assertEqual(sorted(d["url"] for d in result), sorted("xxxx{}".format(i) for i in range(100)))
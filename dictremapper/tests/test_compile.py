@@ -0,0 +1,225 @@
+# -*- coding:utf-8 -*-
+import unittest
+
+
+class Tests(unittest.TestCase):
+    def _getTargetClass(self):
+        from dictremapper import Remapper
+        return Remapper
+
+    def _getPath(self, *args, **kwargs):
+        from dictremapper import Path
+        return Path(*args, **kwargs)
+
+    def assertSameResult(self, mapper_class, d, excludes=None):
+        expected = mapper_class(excludes=excludes)(d)
+        result = mapper_class.compile(excludes=excludes)(d)
+        self.assertEqual(result, expected)
+        self.assertEqual(type(result), type(expected))
+        self.assertEqual(list(result.keys()), list(expected.keys()))
+        return result
+
+    def test_it(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("full_name")
+            url = self._getPath("html.html_url")
+            star = self._getPath("stargazers_count", default=0, callback=int)
+            year = self._getPath("published_at.0")
+            renamed = self._getPath("full_name", name="@name")
+
+        d = {"html": {"html_url": "xxxx"}, "full_name": "yyyy", "published_at": ["2000", "11"]}
+        result = self.assertSameResult(MyMapper, d)
+        self.assertEqual(result, {"name": "yyyy", "url": "xxxx", "star": 0, "year": "2000", "@name": "yyyy"})
+
+    def test_cached(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        self.assertIs(MyMapper.compile(excludes=["x"]), MyMapper.compile(excludes=["x"]))
+        self.assertIsNot(MyMapper.compile(), MyMapper.compile(excludes=["name"]))
+
+    def test_missing_key(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        with self.assertRaises(KeyError):
+            MyMapper.compile()({})
+
+    def test_squashed(self):
+        class MyMapper(self._getTargetClass()):
+            nameset = self._getPath("repositories[].packages[].name")
+
+        d = {"repositories": [{"packages": [{"name": "a"}, {"name": "b"}]}, {"packages": [{"name": "x"}]}]}
+        result = self.assertSameResult(MyMapper, d)
+        self.assertEqual(result["nameset"], [["a", "b"], ["x"]])
+
+    def test_nested__exclude(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("full_name")
+            description = self._getPath("description")
+            url = self._getPath("html_url")
+            star = self._getPath("html_url", callback=int, default=0)
+
+        class MyMapper2(self._getTargetClass()):
+            packages = self._getPath("packages", callback=MyMapper(excludes=["star"], many=True))
+
+        class MyMapper3(self._getTargetClass()):
+            toplevel = self._getPath("toplevel", callback=MyMapper2(excludes=["packages.url"]))
+
+        d = {"toplevel": {"packages": [
+            {"html_url": "xxxx", "full_name": "yyyy", "star": "10", "description": "zzzzz"},
+            {"html_url": "xxxx", "full_name": "yyyy", "star": "10", "description": "zzzzz"}
+        ]}}
+        result = self.assertSameResult(MyMapper3, d, excludes=["toplevel.packages.description"])
+        self.assertEqual(result, {"toplevel": {"packages": [{"name": "yyyy"}, {"name": "yyyy"}]}})
+
+    def test_composed_and_aggregate(self):
+        from dictremapper import Composed, Aggregate
+
+        class MyMapper(self._getTargetClass()):
+            fullname = Composed(
+                [self._getPath("first_name"), self._getPath("last_name")],
+                callback=lambda x, y: "{} {}".format(x, y)
+            )
+            first = self._getPath("first_name", tmpstate=True)
+            initial = Aggregate(lambda d: d["first"][0])
+
+        self.assertSameResult(MyMapper, {"first_name": "foo", "last_name": "bar"})
+
+    def test_lazy(self):
+        from dictremapper import LazyMapperCallable, Self
+
+        D = {}
+
+        class AuthorMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            books = self._getPath("books", callback=LazyMapperCallable("BookMapper", many=True, excludes=('author', ), loader=D.__getitem__))
+
+        class BookMapper(self._getTargetClass()):
+            title = self._getPath("title")
+            author = self._getPath("author", callback=LazyMapperCallable("AuthorMapper", excludes=("books", ), loader=D.__getitem__))
+
+        class FriendMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            friends = self._getPath("friends", callback=Self(many=True))
+
+        D["AuthorMapper"] = AuthorMapper
+        D["BookMapper"] = BookMapper
+
+        d = {"title": "As I Lay Dying", "author": {"name": "William Faulkner", "books": []}}
+        self.assertSameResult(BookMapper, d)
+        d2 = {"name": "William Faulkner", "books": [{"title": "As I Lay Dying", "author": {}}]}
+        self.assertSameResult(AuthorMapper, d2)
+        d3 = {"name": "Steve", "friends": [{"name": "Mike", "friends": [{"name": "Joe", "friends": []}]}]}
+        self.assertSameResult(FriendMapper, d3, excludes=["friends.friends.name"])
+
+    def test_lazy__not_plain_target(self):
+        from dictremapper import LazyMapperCallable, MissingKeyError
+
+        D = {}
+
+        class ChildMapper(self._getTargetClass()):
+            a = self._getPath("a")
+            b = self._getPath("b")
+
+            def as_dict(self, data, stack, excludes_dict):
+                return super(ChildMapper, self).as_dict(data, stack, excludes_dict)
+
+        class MyMapper(self._getTargetClass()):
+            child = self._getPath("child", callback=LazyMapperCallable("ChildMapper", loader=D.__getitem__))
+
+        D["ChildMapper"] = ChildMapper
+        remap = MyMapper.compile(excludes=["child.b"])
+        with self.assertRaises(MissingKeyError):
+            remap({"child": {"b": 1}})
+        # the failed call doesn't leave frames behind
+        self.assertEqual(remap({"child": {"a": 1, "b": 2}}), {"child": {"a": 1}})
+
+    def test_missing_key__nested_fields(self):
+        from dictremapper import LazyMapperCallable, MissingKeyError
+
+        D = {}
+
+        class NameMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        class ItemMapper(self._getTargetClass()):
+            id = self._getPath("id")
+            owner = self._getPath("owner", callback=NameMapper())
+
+        class MyMapper(self._getTargetClass()):
+            body = self._getPath("body", callback=NameMapper())
+            items = self._getPath("items", callback=ItemMapper(many=True))
+            parent = self._getPath("parent", callback=LazyMapperCallable("ItemMapper", loader=D.__getitem__))
+
+        D["ItemMapper"] = ItemMapper
+        d = {"body": {"name": "x"}, "items": [{"id": 1, "owner": {"name": "y"}}], "parent": {"id": 0, "owner": {"name": "z"}}}
+        broken = [
+            ({"body": {}}, ("body", "name")),
+            ({"items": [{"id": 1, "owner": {}}]}, ("items", "owner", "name")),
+            ({"parent": {"id": 0, "owner": {}}}, ("parent", "owner", "name")),
+        ]
+        for update, fields in broken:
+            data = dict(d, **update)
+            for remap in [MyMapper(), MyMapper.compile(), MyMapper().dumps]:
+                with self.assertRaises(MissingKeyError) as c:
+                    remap(data)
+                self.assertEqual(c.exception.fields, fields)
+
+    def test_nested__stream_option(self):
+        import types
+        from dictremapper import Self
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            children = self._getPath("children", callback=Self(many="stream"))
+
+        d = {"name": "a", "children": [{"name": "b", "children": []}]}
+        result = MyMapper.compile()(d)
+        self.assertIsInstance(result["children"], types.GeneratorType)
+        child = list(result["children"])[0]
+        self.assertEqual(child["name"], "b")
+        self.assertEqual(list(child["children"]), [])
+
+    def test_shared_prefix(self):
+        class MyMapper(self._getTargetClass()):
+            login = self._getPath("owner.login", default=None)
+            href = self._getPath("owner.links.self.href", default="-")
+            rel = self._getPath("owner.links.rel", default="-")
+            owner = self._getPath("owner", callback=len, default=0)
+            names = self._getPath("packages[].name", default=[])
+            versions = self._getPath("packages[].version", default=[])
+
+        plan = MyMapper.get_plan(MyMapper().excludes.data)
+        self.assertEqual([chain for _, chain in plan.prefixes], [("owner", ), ("packages", ), ("links", )])
+
+        d = {
+            "owner": {"login": "foo", "links": {"self": {"href": "xxx"}, "rel": "yyy"}},
+            "packages": [{"name": "a", "version": "1"}],
+        }
+        self.assertSameResult(MyMapper, d)
+        self.assertIn("p1 = data['owner']", MyMapper.compile().source)
+        self.assertSameResult(MyMapper, {"owner": {"links": {}}})
+        self.assertSameResult(MyMapper, {"packages": []})
+        self.assertSameResult(MyMapper, {})
+
+    def test_batch_callback(self):
+        calls = []
+
+        def to_int(xs):
+            calls.append(len(xs))
+            return [int(x) for x in xs]
+
+        class ItemMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            size = self._getPath("size", batch_callback=to_int)
+
+        class MyMapper(self._getTargetClass()):
+            size = self._getPath("size", batch_callback=to_int)
+            items = self._getPath("items", callback=ItemMapper(many=True))
+
+        d = {"size": "1", "items": [{"name": "a", "size": "10"}, {"name": "b", "size": "20"}]}
+        self.assertSameResult(MyMapper, d)
+        del calls[:]
+        MyMapper.compile()(d)
+        self.assertEqual(calls, [1, 2])
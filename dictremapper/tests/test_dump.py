@@ -0,0 +1,98 @@
+# -*- coding:utf-8 -*-
+import unittest
+import json
+
+
+class Tests(unittest.TestCase):
+    def _getTargetClass(self):
+        from dictremapper import Remapper
+        return Remapper
+
+    def _getPath(self, *args, **kwargs):
+        from dictremapper import Path
+        return Path(*args, **kwargs)
+
+    def assertSameJSON(self, mapper, d):
+        expected = json.dumps(mapper(d))
+        self.assertEqual(mapper.dumps(d), expected)
+        self.assertEqual(mapper.dumps_bytes(d), expected.encode("utf-8"))
+        return expected
+
+    def test_it(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("full_name")
+            url = self._getPath("html.html_url")
+            star = self._getPath("stargazers_count", default=0, callback=int)
+            ok = self._getPath("ok", default=None)
+            score = self._getPath("score", default=1.5)
+            tags = self._getPath("tags[].name", default=[])
+            renamed = self._getPath("full_name", name="@name")
+
+        d = {"html": {"html_url": "xxxx"}, "full_name": "yé\"y", "ok": True, "tags": [{"name": "a"}]}
+        self.assertSameJSON(MyMapper(), d)
+        self.assertSameJSON(MyMapper(excludes=["url", "tags"]), d)
+        self.assertSameJSON(MyMapper(many=True), [d, d])
+        self.assertSameJSON(MyMapper(many=True), [])
+
+    def test_nested(self):
+        from dictremapper import Self, Composed, Aggregate
+
+        class PackageMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            version = self._getPath("version", default=None)
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            packages = self._getPath("packages", callback=PackageMapper(many=True), default=[])
+            main = self._getPath("main", callback=PackageMapper(excludes=["version"]), default=None)
+            children = self._getPath("children", callback=Self(many=True), default=[])
+            count = self._getPath("packages", callback=len, default=0)
+            summary = Composed([self._getPath("name"), self._getPath("packages", default=[])],
+                               callback=lambda name, xs: "{}({})".format(name, len(xs)))
+
+        class AggregatedMapper(MyMapper):
+            first = self._getPath("name", tmpstate=True)
+            initial = Aggregate(lambda d: d["first"][0])
+
+        d = {
+            "name": "a",
+            "packages": [{"name": "x", "version": "1"}, {"name": "y"}],
+            "main": {"name": "x", "version": "1"},
+            "children": [{"name": "b", "children": [{"name": "c"}]}],
+        }
+        self.assertSameJSON(MyMapper(), d)
+        self.assertSameJSON(MyMapper(excludes=["children.packages", "main"]), d)
+        self.assertSameJSON(AggregatedMapper(), d)
+
+    def test_dump_lines(self):
+        from io import StringIO
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        out = StringIO()
+        MyMapper().dump_lines(iter([{"name": "a"}, {"name": "b"}, {"name": "c"}]), out, chunksize=2)
+        self.assertEqual(out.getvalue(), '{"name": "a"}\n{"name": "b"}\n{"name": "c"}\n')
+
+    def test_missing_key(self):
+        from io import StringIO
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        out = StringIO()
+        with self.assertRaises(KeyError):
+            MyMapper().dump_lines([{"name": "a"}, {}], out)
+        self.assertEqual(out.getvalue(), "")  # partial records are never written
+
+    def test_customized_mapper(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            age = self._getPath("age")
+
+            def as_dict(self, data, stack, excludes_dict):
+                d = super(MyMapper, self).as_dict(data, stack, excludes_dict)
+                d["extra"] = 1
+                return d
+
+        self.assertSameJSON(MyMapper(excludes=["age"]), {"name": "a", "age": 1})
@@ -0,0 +1,87 @@
+# -*- coding:utf-8 -*-
+import unittest
+import copy
+
+
+class Tests(unittest.TestCase):
+    def _getTargetClass(self):
+        from dictremapper import Remapper
+        return Remapper
+
+    def _getPath(self, *args, **kwargs):
+        from dictremapper import Path
+        return Path(*args, **kwargs)
+
+    def _makeMapper(self, calls):
+        from dictremapper import Composed, Aggregate, Self
+
+        def counted(name, fn):
+            def callback(*args):
+                calls.append(name)
+                return fn(*args)
+            return callback
+
+        class ItemMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            count = self._getPath("count", callback=counted("item.count", int))
+
+        class MyMapper(self._getTargetClass()):
+            status = self._getPath("status")
+            login = self._getPath("owner.login", callback=counted("login", str))
+            tags = self._getPath("tags[].name", default=[])
+            items = self._getPath("items", callback=ItemMapper(many=True))
+            main = self._getPath("main", callback=ItemMapper(), default=None)
+            children = self._getPath("children", callback=Self(many=True), default=[])
+            title = Composed([self._getPath("status"), self._getPath("owner.login")],
+                             callback=counted("title", lambda x, y: "{}:{}".format(x, y)))
+            first = self._getPath("status", tmpstate=True)
+            initial = Aggregate(counted("initial", lambda d: d["first"][0]), depends=["first"])
+        return MyMapper
+
+    def _makeData(self):
+        return {
+            "status": "open",
+            "owner": {"login": "foo"},
+            "tags": [{"name": "a"}],
+            "items": [{"name": "x", "count": "1"}, {"name": "y", "count": "2"}],
+            "main": {"name": "z", "count": "3"},
+            "children": [{"status": "draft", "owner": {"login": "bar"}, "items": []}],
+        }
+
+    def test_it(self):
+        calls = []
+        mapper = self._makeMapper(calls)()
+        data = self._makeData()
+        old = mapper(data)
+
+        cases = [
+            (["items.1.count"], lambda d: d["items"][1].__setitem__("count", "20"), ["item.count"]),
+            (["main.count"], lambda d: d["main"].__setitem__("count", "30"), ["item.count"]),
+            (["tags.0.name"], lambda d: d["tags"][0].__setitem__("name", "b"), []),
+            (["owner"], lambda d: d.__setitem__("owner", {"login": "boo"}), ["login", "title"]),
+            (["status"], lambda d: d.__setitem__("status", "closed"), ["title", "initial"]),
+            (["children.0.status"], lambda d: d["children"][0].__setitem__("status", "merged"), ["title", "initial"]),
+            (["items"], lambda d: d["items"].append({"name": "w", "count": "4"}), ["item.count"] * 3),
+        ]
+        for changed_paths, change, expected_calls in cases:
+            new_data = copy.deepcopy(data)
+            change(new_data)
+            del calls[:]
+            result = mapper.remap_incremental(old, changed_paths, new_data)
+            self.assertEqual(calls, expected_calls, changed_paths)
+            self.assertEqual(result, mapper(new_data))
+            self.assertEqual(list(result.keys()), list(old.keys()))
+        self.assertEqual(old, mapper(data))  # not modified
+
+    def test_many(self):
+        calls = []
+        mapper = self._makeMapper(calls)(many=True, excludes=["children"])
+        dataset = [self._makeData(), self._makeData()]
+        old = mapper(dataset)
+        new_dataset = copy.deepcopy(dataset)
+        new_dataset[1]["items"][0]["count"] = "10"
+        del calls[:]
+        result = mapper.remap_incremental(old, ["1.items.0.count"], new_dataset)
+        self.assertEqual(calls, ["item.count"])
+        self.assertEqual(result, mapper(new_dataset))
+        self.assertIs(result[0], old[0])
@@ -1,4 +1,5 @@
 # -*- coding:utf-8 -*-
+import importlib.util
 import unittest
 
 
@@ -59,6 +60,17 @@ class Tests(unittest.TestCase):
         result = mapper(d)
         self.assertEqual(result, {"year": "2000"})
 
+    def test_deep_access(self):
+        class MyMapper(self._getTargetClass()):
+            names = self._getPath("a.b.c[].d.0.e")
+            items = self._getPath("a.b.c[]")
+            missing = self._getPath("a.b.c[].x", default=None)
+
+        d = {"a": {"b": {"c": [{"d": [{"e": 1}]}, {"d": [{"e": 2}, {"e": 3}]}]}}}
+        result = MyMapper()(d)
+        self.assertEqual(result, {"names": [1, 2], "items": d["a"]["b"]["c"], "missing": None})
+        self.assertIsNot(result["items"], d["a"]["b"]["c"])
+
     def test_inherited(self):
         class URL(self._getTargetClass()):
             url = self._getPath("html.html_url")
@@ -122,6 +134,40 @@ class Tests(unittest.TestCase):
             OrderedDict([("name", "yyyy2"), ("url", "xxxx2")]),
         ])
 
+    def test_iter_many(self):
+        import types
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("full_name")
+
+        def gen():
+            yield {"full_name": "yyyy1"}
+            yield {"full_name": "yyyy2"}
+
+        result = MyMapper().iter_many(gen())
+        self.assertIsInstance(result, types.GeneratorType)
+        self.assertEqual(list(result), [{"name": "yyyy1"}, {"name": "yyyy2"}])
+
+        result = MyMapper(many="stream", excludes=["name"])(gen())
+        self.assertEqual(list(result), [{}, {}])
+
+    def test_nested__stream_option(self):
+        from dictremapper import Self
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("full_name")
+
+        class MyMapper2(self._getTargetClass()):
+            packages = self._getPath("packages", callback=MyMapper(many="stream"))
+            children = self._getPath("children", callback=Self(many="stream"), default=None)
+
+        d = {"packages": [{"full_name": "yyyy1"}], "children": [{"packages": [{"full_name": "yyyy2"}]}]}
+        result = MyMapper2(excludes=["children.packages.name"])(d)
+        self.assertEqual(list(result["packages"]), [{"name": "yyyy1"}])
+        child = list(result["children"])[0]
+        self.assertEqual(list(child["packages"]), [{}])
+        self.assertIsNone(child["children"])
+
     def test_nested__many_option(self):
         from collections import OrderedDict
 
@@ -214,6 +260,61 @@ class Tests(unittest.TestCase):
         result = MyMapper3(excludes=["toplevel.packages.description"])(d)
         self.assertEqual(result, {"toplevel": {"packages": [{"name": "yyyy"}, {"name": "yyyy"}]}})
 
+    def test_exclude_set__merge(self):
+        from dictremapper import ExcludeSet, EMPTY
+
+        excludes = ExcludeSet(["a.b", "c"])
+        merged = excludes.merge(ExcludeSet(["a.d", "a.e.f"]).data)
+        self.assertIs(merged, ExcludeSet(["c", "a.e.f", "a.d", "a.b"]).data)
+        self.assertEqual(merged[""], {"c"})
+        self.assertEqual(merged["a"][""], {"b", "d"})
+        self.assertIs(merged.get("x", EMPTY), EMPTY)
+        self.assertIs(excludes.merge(EMPTY), excludes.data)
+
+    def test_missing_key(self):
+        from dictremapper import MissingKeyError
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        class MyMapper2(self._getTargetClass()):
+            body = self._getPath("body", callback=MyMapper())
+
+        class Huge(dict):
+            def __repr__(self):
+                raise AssertionError("not formatted")
+
+        with self.assertRaises(KeyError) as c:
+            MyMapper2()({"body": Huge()})
+        self.assertIsInstance(c.exception, MissingKeyError)
+        self.assertEqual(c.exception.keys, ["name"])
+        self.assertEqual(c.exception.fields, ("body", "name"))
+
+        with self.assertRaises(KeyError) as c:
+            MyMapper2()({"body": {"x": 1}})
+        self.assertEqual(str(c.exception), "['name'] is not in {'x': 1} (field: body.name)")
+
+    def test_collect_errors(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            age = self._getPath("age", callback=int)
+            url = self._getPath("url", default=None)
+
+        dataset = [{"name": "foo", "age": "10"}, {"age": "x"}, {"name": "bar", "age": "20"}]
+        result, errors = MyMapper(many=True, collect_errors=True)(dataset)
+        self.assertEqual(result, [{"name": "foo", "age": 10, "url": None}, {"url": None}, {"name": "bar", "age": 20, "url": None}])
+        self.assertEqual([[e.fields for e in errs] for errs in errors], [[], [("name", ), ("age", )], []])
+        self.assertIsInstance(errors[1][0].error, KeyError)
+        self.assertIsInstance(errors[1][1].error, ValueError)
+
+        class MyMapper2(self._getTargetClass()):
+            id = self._getPath("id")
+            body = self._getPath("body", callback=MyMapper())
+
+        result, errors = MyMapper2(collect_errors=True)({"id": 1, "body": {"age": 10}})
+        self.assertEqual(result, {"id": 1})
+        self.assertEqual([e.fields for e in errors], [("body", "name")])
+
     def test_composed(self):
         from dictremapper import Composed
 
@@ -226,6 +327,44 @@ class Tests(unittest.TestCase):
         result = MyMapper()({"first_name": "foo", "last_name": "bar"})
         self.assertEqual(result, {"fullname": "foo bar"})
 
+    def test_aggregate(self):
+        from dictremapper import Aggregate
+
+        seen = []
+
+        class MyMapper(self._getTargetClass()):
+            first = self._getPath("first_name", tmpstate=True)
+
+            @Aggregate
+            def fullname(d):
+                seen.append(list(d.keys()))
+                return "{} {}".format(d["first"], d["last"])
+
+            last = self._getPath("last_name")
+            ignored = self._getPath("ignored", tmpstate=True)
+
+        result = MyMapper()({"first_name": "foo", "last_name": "bar", "ignored": 0})
+        self.assertEqual(list(result.items()), [("fullname", "foo bar"), ("last", "bar")])
+        self.assertEqual(seen, [["first", "last", "ignored"]])
+
+    def test_tmpstate_without_aggregate(self):
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            unused = self._getPath("unused", tmpstate=True)
+
+        result = MyMapper()({"name": "foo"})
+        self.assertEqual(result, {"name": "foo"})
+
+    def test_plain_dict(self):
+        import sys
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        result = MyMapper()({"name": "foo"})
+        if sys.version_info >= (3, 7):
+            self.assertIs(type(result), dict)
+
     def test_shortcut(self):
         from dictremapper import Shortcut
 
@@ -245,6 +384,9 @@ class Tests(unittest.TestCase):
         result = mapper(d)
         self.assertEqual(result, [{"name": "a"}, {"name": "b"}])
 
+        mapper2 = Shortcut(MyMapper(), "Main.0")
+        self.assertEqual(mapper2({"Main": [{"Name": "x"}]}), {"name": "x"})
+
     def test_lazy(self):
         from dictremapper import LazyMapperCallable
 
@@ -289,6 +431,32 @@ class Tests(unittest.TestCase):
         result2 = AuthorMapper()(d2)
         self.assertEqual(result2, {"name": "William Faulkner", "books": [{"title": "As I Lay Dying"}]})
 
+    def test_lazy__resolved_once(self):
+        from dictremapper import LazyMapperCallable, resolve_all
+
+        loaded = []
+
+        def loader(k):
+            loaded.append(k)
+            return D[k]
+
+        class BookMapper(self._getTargetClass()):
+            title = self._getPath("title")
+
+        class AuthorMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            books = self._getPath("books", callback=LazyMapperCallable("BookMapper", many=True, loader=loader))
+            books2 = self._getPath("books", callback=LazyMapperCallable("BookMapper", many=True, loader=loader))
+
+        D = {"BookMapper": BookMapper}
+        resolve_all(AuthorMapper)
+        self.assertEqual(loaded, ["BookMapper"])
+
+        d = {"name": "foo", "books": [{"title": "bar"}]}
+        self.assertEqual(AuthorMapper()(d), {"name": "foo", "books": [{"title": "bar"}], "books2": [{"title": "bar"}]})
+        self.assertEqual(loaded, ["BookMapper"])
+        self.assertIs(AuthorMapper.books.callback.targets[AuthorMapper], AuthorMapper.books2.callback.targets[AuthorMapper])
+
     def test_nested_self(self):
         from dictremapper import Self
 
@@ -323,3 +491,267 @@ class Tests(unittest.TestCase):
             ]
         }
         self.assertEqual(result, expected)
+
+    def test_batch_callback(self):
+        calls = []
+
+        def to_int(xs):
+            calls.append(list(xs))
+            return [int(x) for x in xs]
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            star = self._getPath("star", batch_callback=to_int, default=0)
+            scores = self._getPath("scores[].value", batch_callback=to_int, default=[])
+
+        dataset = [
+            {"name": "a", "star": "10", "scores": [{"value": "1"}, {"value": "2"}]},
+            {"name": "b"},
+            {"name": "c", "star": "20", "scores": [{"value": "3"}]},
+        ]
+        result = MyMapper(many=True)(dataset)
+        self.assertEqual(result, [
+            {"name": "a", "star": 10, "scores": [1, 2]},
+            {"name": "b", "star": 0, "scores": []},
+            {"name": "c", "star": 20, "scores": [3]},
+        ])
+        self.assertEqual(calls, [["10", "20"], ["1", "2", "3"]])
+
+        del calls[:]
+        self.assertEqual(MyMapper()(dataset[0]), result[0])
+        self.assertEqual(calls, [["10"], ["1", "2"]])
+
+        with self.assertRaises(ValueError):
+            self._getPath("star", callback=int, batch_callback=to_int)
+
+    def test_batch_callback__nested_fanout(self):
+        calls = []
+
+        def to_int(xs):
+            calls.append(list(xs))
+            return [int(x) for x in xs]
+
+        class MyMapper(self._getTargetClass()):
+            values = self._getPath("a[].b[].c", batch_callback=to_int, default=[])
+
+        dataset = [
+            {"a": [{"b": [{"c": "1"}, {"c": "2"}]}, {"b": []}, {"b": [{"c": "3"}]}]},
+            {},
+            {"a": [{"b": []}]},
+            {"a": [{"b": [{"c": "4"}]}]},
+        ]
+        result = MyMapper(many=True)(dataset)
+        self.assertEqual([d["values"] for d in result], [[[1, 2], [], [3]], [], [[]], [[4]]])
+        self.assertEqual(calls, [["1", "2", "3", "4"]])
+        self.assertEqual(MyMapper()(dataset[0]), result[0])
+        self.assertEqual(MyMapper(many=True)(dataset[1:3]), result[1:3])  # no values
+
+    def test_as_columns(self):
+        import array
+        from dictremapper import Aggregate
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            star = self._getPath("star", default=0, dtype="q")
+            first = self._getPath("name", tmpstate=True)
+            initial = Aggregate(lambda d: d["first"][0])
+            url = self._getPath("url", default=None)
+
+        dataset = [{"name": "foo", "star": 10}, {"name": "bar", "url": "xxx"}]
+        columns = MyMapper(excludes=["url"]).as_columns(iter(dataset))
+        self.assertEqual(list(columns.keys()), ["name", "star", "initial"])
+        self.assertEqual(columns["name"], ["foo", "bar"])
+        self.assertEqual(columns["star"], array.array("q", [10, 0]))
+        self.assertEqual(columns["initial"], ["f", "b"])
+
+        rows = MyMapper(many=True)(dataset)
+        columns = MyMapper().as_columns(dataset)
+        self.assertEqual({k: list(v) for k, v in columns.items()}, {k: [row[k] for row in rows] for k in rows[0]})
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+    def test_as_columns__numpy(self):
+        import numpy
+
+        class MyMapper(self._getTargetClass()):
+            score = self._getPath("score", dtype=numpy.float64)
+
+        columns = MyMapper().as_columns([{"score": 1}, {"score": 2.5}])
+        self.assertEqual(columns["score"].dtype, numpy.float64)
+        self.assertEqual(columns["score"].tolist(), [1.0, 2.5])
+
+    def test_memo(self):
+        from dictremapper import LazyMapperCallable
+
+        calls = []
+        D = {}
+
+        class AuthorMapper(self._getTargetClass()):
+            name = self._getPath("name", callback=lambda x: calls.append(x) or x)
+
+        class BookMapper(self._getTargetClass()):
+            title = self._getPath("title")
+            author = self._getPath("author", callback=AuthorMapper())
+            coauthor = self._getPath("author", callback=LazyMapperCallable("AuthorMapper", loader=D.__getitem__))
+            editor = self._getPath("author", callback=AuthorMapper(excludes=["name"]))
+
+        D["AuthorMapper"] = AuthorMapper
+
+        author = {"name": "foo"}
+        books = [{"title": "a", "author": author}, {"title": "b", "author": author},
+                 {"title": "c", "author": {"name": "foo"}}]
+
+        result = BookMapper(many=True, memo=True)(books)
+        self.assertEqual(result, BookMapper(many=True)(books))
+        self.assertEqual(len(calls), 2 + 3 * 2)
+        del calls[:]
+
+        result = BookMapper(many=True, memo=True)(books)
+        self.assertEqual(len(calls), 2)
+        self.assertIs(result[0]["author"], result[1]["author"])
+        self.assertIs(result[0]["author"], result[0]["coauthor"])
+        self.assertIsNot(result[0]["author"], result[2]["author"])
+        self.assertEqual(result[0]["editor"], {})
+
+        result2 = BookMapper(many=True, memo=True)(books)
+        self.assertIsNot(result[0]["author"], result2[0]["author"])  # only in a call
+
+    def test_access_mode(self):
+        from collections import namedtuple
+        from dataclasses import dataclass, field
+        from dictremapper import MissingKeyError
+
+        Tag = namedtuple("Tag", "name")
+
+        @dataclass
+        class Owner:
+            login: str
+
+        @dataclass
+        class Repo:
+            name: str
+            owner: Owner
+            tags: list = field(default_factory=list)
+            meta: dict = field(default_factory=dict)
+
+        class OwnerMapper(self._getTargetClass()):
+            access_mode = "attr"
+            login = self._getPath("login")
+
+        class RepoMapper(self._getTargetClass()):
+            access_mode = "attr"
+            name = self._getPath("name")
+            login = self._getPath("owner.login")
+            owner = self._getPath("owner", callback=OwnerMapper())
+            tags = self._getPath("tags[].name")
+            first_tag = self._getPath("tags.0.name", default=None)
+            star = self._getPath("star", default=0)
+
+        repo = Repo(name="foo", owner=Owner(login="bar"), tags=[Tag("x"), Tag("y")], meta={"lang": "py"})
+        expected = {"name": "foo", "login": "bar", "owner": {"login": "bar"}, "tags": ["x", "y"], "first_tag": "x",
+                    "star": 0}
+        self.assertEqual(RepoMapper()(repo), expected)
+        self.assertEqual(RepoMapper(many=True)([repo]), [expected])
+        self.assertEqual(RepoMapper.compile()(repo), expected)
+        with self.assertRaises(MissingKeyError):
+            OwnerMapper()(object())
+
+        class AutoMapper(self._getTargetClass()):
+            access_mode = "auto"
+            name = self._getPath("name")
+            lang = self._getPath("meta.lang")
+            tags = self._getPath("tags[].name")
+            login = self._getPath("owner.login")
+
+        expected = {"name": "foo", "lang": "py", "tags": ["x", "y"], "login": "bar"}
+        self.assertEqual(AutoMapper()(repo), expected)
+        d = {"name": "foo", "meta": {"lang": "py"}, "tags": [Tag("x"), Tag("y")], "owner": Owner(login="bar")}
+        self.assertEqual(AutoMapper()(d), expected)
+        self.assertEqual(AutoMapper.compile()(d), expected)
+
+    def test_only(self):
+        from dictremapper import Aggregate, LazyMapperCallable
+
+        calls = []
+        D = {}
+
+        class ChildMapper(self._getTargetClass()):
+            id = self._getPath("id")
+            name = self._getPath("name", callback=lambda x: calls.append(x) or x)
+
+        class MyMapper(self._getTargetClass()):
+            id = self._getPath("id")
+            title = self._getPath("title", name="@title")
+            children = self._getPath("children", callback=ChildMapper(many=True))
+            parent = self._getPath("parent", callback=LazyMapperCallable("ChildMapper", loader=D.__getitem__))
+            size = self._getPath("size", tmpstate=True)
+            total = Aggregate(lambda d: d["size"] * len(d["children"]))
+
+        D["ChildMapper"] = ChildMapper
+        d = {"id": 1, "title": "t", "size": 2, "parent": {"id": 0, "name": "p"},
+             "children": [{"id": 2, "name": "a"}, {"id": 3, "name": "b"}]}
+
+        self.assertEqual(MyMapper(only=["id", "@title"])(d), {"id": 1, "@title": "t"})
+        self.assertEqual(MyMapper(only=["children.id", "parent.id"])(d), {"children": [{"id": 2}, {"id": 3}],
+                                                                           "parent": {"id": 0}})
+        self.assertEqual(calls, [])
+        self.assertEqual(MyMapper(only=["children", "children.id"])(d)["children"], d["children"])
+        self.assertEqual(MyMapper(only=["children", "id"], excludes=["children.name"])(d),
+                         {"id": 1, "children": [{"id": 2}, {"id": 3}]})
+        self.assertIs(MyMapper(only=["id", "@title"]).excludes.data, MyMapper(only=["@title", "id"]).excludes.data)
+
+        # attribute names can be used, as excludes
+        self.assertEqual(MyMapper(only=["title"])(d), {"@title": "t"})
+        self.assertIs(MyMapper(only=["title", "@title"]).excludes.data, MyMapper(only=["@title"]).excludes.data)
+        self.assertEqual(MyMapper(only=["title", "parent.name"])(d),
+                         MyMapper(excludes=["id", "children", "parent.id", "total"])(d))
+
+        # fields read by aggregates are computed, but not in the output
+        self.assertEqual(MyMapper(only=["total"])(d), {"total": 4})
+        self.assertEqual(MyMapper.compile(only=["total", "id"])(d), {"id": 1, "total": 4})
+
+        with self.assertRaises(ValueError):
+            MyMapper(only=["children.xxx"])
+        with self.assertRaises(ValueError):  # not a nested mapper
+            MyMapper(only=["@title.x"])
+
+    def test_only__aggregates(self):
+        from dictremapper import Aggregate
+
+        calls = []
+
+        class MyMapper(self._getTargetClass()):
+            a = self._getPath("a")
+            b = self._getPath("b")
+            c = self._getPath("c", callback=lambda x: calls.append(x) or x)
+            s = Aggregate(lambda d: d["a"] + d["b"])
+            t = Aggregate(lambda d: d["s"] * 10)
+            s2 = Aggregate(lambda d: d["a"] + d["b"], depends=["a", "b"])
+            u = Aggregate(lambda d: d["s2"] + 1, depends=["s2"])
+            v = Aggregate(lambda d: d["a"] - 1, depends=["a"])
+            w = Aggregate(lambda d: d["u"] * 2, depends=["u"])
+
+        d = {"a": 1, "b": 2, "c": 3}
+        self.assertEqual(MyMapper(only=["t"])(d), {"t": 30})
+        self.assertEqual(MyMapper(only=["s", "t"])(d), {"s": 3, "t": 30})
+        self.assertEqual(len(calls), 2)  # depends is unknown
+        del calls[:]
+        self.assertEqual(MyMapper(only=["w"])(d), {"w": 8})
+        self.assertEqual(MyMapper.compile(only=["w", "c"])(d), {"c": 3, "w": 8})
+        self.assertEqual(calls, [3])
+        self.assertEqual(sorted(MyMapper(only=["w"]).excludes.data.names), ["c", "s", "t", "v"])
+
+    def test_only__bounded_caches(self):
+        from dictremapper import _only
+
+        class MyMapper(self._getTargetClass()):
+            a = self._getPath("a")
+
+        for i in range(_only.maxsize + 10):
+            MyMapper(only=["a"], excludes=["x{}".format(i)])({"a": 1})
+
+        WideMapper = type("WideMapper", (self._getTargetClass(), ), {"f{}".format(i): self._getPath("f") for i in range(11)})
+        for i in range(1, _only.maxsize + 10):  # subsets of fields
+            WideMapper(only=["f{}".format(j) for j in range(11) if i & (1 << j)])
+        self.assertLessEqual(len(_only), _only.maxsize)
+        self.assertLessEqual(len(MyMapper._plans), MyMapper._plans.maxsize)
+        self.assertEqual(MyMapper(only=["a"])({"a": 1}), {"a": 1})
@@ -0,0 +1,106 @@
+# -*- coding:utf-8 -*-
+import unittest
+
+
+class Tests(unittest.TestCase):
+    def _makeMapper(self):
+        from dictremapper import Remapper, Path, Self, Aggregate
+
+        class CommentMapper(Remapper):
+            id = Path("id")
+            body = Path("body", default="")
+            replies = Path("replies", callback=Self(many=True))
+            parent = Path("parent", callback=Self(), default=None)
+            tmp = Path("replies", tmpstate=True)
+            nreplies = Aggregate(lambda d: len(d["tmp"]))
+
+        return CommentMapper
+
+    def _makeThread(self, depth):
+        node = {"id": depth, "body": "x", "replies": []}
+        for i in reversed(range(depth)):
+            node = {"id": i, "replies": [node, {"id": -i, "replies": []}], "parent": {"id": -1, "replies": []}}
+        return node
+
+    def test_same_result(self):
+        from dictremapper import Remapper, Path, LazyMapperCallable, Composed
+
+        CommentMapper = self._makeMapper()
+        d = self._makeThread(10)
+        self.assertEqual(CommentMapper(iterative=True)(d), CommentMapper()(d))
+        excludes = ["body", "replies.parent", "replies.replies.body"]
+        self.assertEqual(CommentMapper(iterative=True, excludes=excludes)(d), CommentMapper(excludes=excludes)(d))
+        self.assertEqual(CommentMapper(iterative=True, many=True)([d, d]), CommentMapper(many=True)([d, d]))
+
+        D = {}
+
+        class BookMapper(Remapper):
+            title = Path("title")
+            author = Path("author", callback=LazyMapperCallable("AuthorMapper", excludes=("books", ), loader=D.__getitem__))
+
+        class AuthorMapper(Remapper):
+            name = Composed([Path("first_name"), Path("last_name")], callback=lambda x, y: x + y)
+            books = Path("books", callback=BookMapper(many=True))
+
+        D["AuthorMapper"] = AuthorMapper
+        d = {"first_name": "foo", "last_name": "bar", "books": [{"title": "x", "author": {"first_name": "a", "last_name": "b"}}]}
+        self.assertEqual(AuthorMapper(iterative=True)(d), AuthorMapper()(d))
+
+    def test_deep(self):
+        import sys
+
+        CommentMapper = self._makeMapper()
+        depth = sys.getrecursionlimit() * 2
+        d = self._makeThread(depth)
+        with self.assertRaises(RecursionError):
+            CommentMapper()(d)
+
+        result = CommentMapper(iterative=True)(d)
+        n = 0
+        while result["replies"]:
+            self.assertEqual(result["nreplies"], 2)
+            result = result["replies"][0]
+            n += 1
+        self.assertEqual(n, depth)
+        self.assertEqual(result["body"], "x")
+
+    def test_max_depth(self):
+        from dictremapper.iterative import MaxDepthExceeded
+
+        CommentMapper = self._makeMapper()
+        d = self._makeThread(10)
+        self.assertEqual(CommentMapper(iterative=True, max_depth=10)(d), CommentMapper()(d))
+        with self.assertRaises(MaxDepthExceeded):
+            CommentMapper(iterative=True, max_depth=9)(d)
+
+    def test_missing_key__fields(self):
+        from dictremapper import MissingKeyError
+
+        CommentMapper = self._makeMapper()
+        d = self._makeThread(3)
+        del d["replies"][0]["replies"][1]["id"]
+        with self.assertRaises(MissingKeyError) as c:
+            CommentMapper()(d)
+        with self.assertRaises(MissingKeyError) as ci:
+            CommentMapper(iterative=True)(d)
+        self.assertEqual(ci.exception.fields, ("replies", "replies", "id"))
+        self.assertEqual(ci.exception.fields, c.exception.fields)
+
+    def test_not_plain_nested(self):
+        from dictremapper import Remapper, Path
+
+        calls = []
+
+        class ItemMapper(Remapper):
+            name = Path("name")
+
+            def __call__(self, data, stack=None, excludes_dict=None):
+                calls.append(data)
+                return super(ItemMapper, self).__call__(data, stack=stack, excludes_dict=excludes_dict)
+
+        class MyMapper(Remapper):
+            items = Path("items", callback=ItemMapper(many=True))
+
+        d = {"items": [{"name": "a"}, {"name": "b"}]}
+        self.assertEqual(MyMapper(iterative=True)(d), MyMapper()(d))
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,107 @@
+# -*- coding:utf-8 -*-
+import unittest
+import io
+import json
+import os
+import tempfile
+from dictremapper import Remapper, Path
+
+
+class SummaryMapper(Remapper):  # pickled for workers
+    name = Path("full_name")
+    url = Path("html_url")
+    star = Path("stargazers_count", default=0)
+
+
+class Tests(unittest.TestCase):
+    def _makeInput(self, n, blank=False):
+        fp = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False)
+        self.addCleanup(os.unlink, fp.name)
+        with fp:
+            for i in range(n):
+                fp.write(json.dumps({"full_name": "yyyy{}".format(i), "html_url": "xxxx{}".format(i)}))
+                fp.write("\n")
+                if blank:
+                    fp.write("\n")
+        return fp.name
+
+    def _tempPath(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        os.unlink(path)
+        self.addCleanup(lambda: os.path.exists(path) and os.unlink(path))
+        return path
+
+    def test_index(self):
+        from dictremapper.jsonl import build_index, load_index, split
+
+        path = self._makeInput(10)
+        with open(path, "rb") as rf:
+            lines = rf.readlines()
+        offsets = build_index(path)
+        self.assertEqual(len(offsets), 11)
+        self.assertEqual(offsets[-1], sum(len(line) for line in lines))
+
+        index_path = self._tempPath()
+        self.assertEqual(load_index(path, index_path=index_path), offsets)
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual(load_index(path, index_path=index_path), offsets)
+
+        shards = split(offsets, 100)
+        self.assertEqual(shards[0][0], 0)
+        self.assertEqual(shards[-1][1], offsets[-1])
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            self.assertEqual(end, start)
+            self.assertIn(start, offsets)
+
+    def test_index__broken(self):
+        from dictremapper.jsonl import build_index, load_index, split
+
+        path = self._makeInput(10)
+        offsets = build_index(path)
+        index_path = self._tempPath()
+        load_index(path, index_path=index_path)
+        with open(index_path, "rb") as rf:
+            data = rf.read()
+        for broken in [data[:-3], data[:-8], data[:16], b""]:
+            with open(index_path, "wb") as wf:
+                wf.write(broken)
+            self.assertEqual(load_index(path, index_path=index_path), offsets)
+            with open(index_path, "rb") as rf:
+                self.assertEqual(rf.read(), data)  # rewritten
+
+        with self.assertRaises(ValueError):
+            split(offsets, 0)
+
+    def test_empty(self):
+        from dictremapper.jsonl import map_file
+
+        out = io.StringIO()
+        map_file(SummaryMapper(), self._makeInput(0), out)
+        self.assertEqual(out.getvalue(), "")
+
+    def test_map_file(self):
+        from dictremapper.jsonl import map_file
+
+        path = self._makeInput(100, blank=True)
+        expected = [SummaryMapper(excludes=["url"])({"full_name": "yyyy{}".format(i)}) for i in range(100)]
+        for workers in (1, 2):
+            out = io.StringIO()
+            map_file(SummaryMapper(excludes=["url"]), path, out, workers=workers, shard_size=300)
+            self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], expected)
+
+    def test_cli__shard_size(self):
+        from dictremapper.cli import main
+
+        with self.assertRaises(SystemExit):
+            main([__name__ + ".SummaryMapper", "-i", self._makeInput(1), "--mmap", "--shard-size", "0"])
+
+    def test_cli(self):
+        from dictremapper.cli import main
+
+        inp = self._makeInput(50)
+        out = self._tempPath()
+        main([__name__ + ".SummaryMapper", "-i", inp, "-o", out, "--mmap", "--workers", "2",
+              "--shard-size", "200", "--index", self._tempPath()])
+        with open(out) as rf:
+            self.assertEqual([json.loads(line)["name"] for line in rf], ["yyyy{}".format(i) for i in range(50)])
@@ -0,0 +1,66 @@
+# -*- coding:utf-8 -*-
+import unittest
+from dictremapper import Remapper, Path, Composed, Aggregate, LazyMapperCallable
+
+
+# worker processes import these by module path
+class BookMapper(Remapper):
+    title = Path("title")
+    author = Path("author", callback=LazyMapperCallable(__name__ + ".AuthorMapper", excludes=("books", )))
+
+
+class AuthorMapper(Remapper):
+    name = Path("name")
+    fullname = Composed([Path("name"), Path("age", callback=str)], callback=lambda x, y: x + y)
+    books = Path("books", callback=BookMapper(many=True, excludes=["author"]), tmpstate=True)
+    nbooks = Aggregate(lambda d: len(d["books"]))
+
+
+class Tests(unittest.TestCase):
+    def test_pickle(self):
+        import pickle
+        from dictremapper import Shortcut
+
+        mapper = AuthorMapper(many=True, excludes=["books.title"])
+        mapper.get_current_excludes_dict([])
+        BookMapper.author.callback.targets[BookMapper] = AuthorMapper()
+        restored = pickle.loads(pickle.dumps(mapper))
+        self.assertEqual(restored.many, True)
+        self.assertIs(restored.excludes.data, mapper.excludes.data)
+
+        path = pickle.loads(pickle.dumps(Path("a.b[].c", default=None)))
+        self.assertEqual(path({"a": {"b": [{"c": 1}]}}, []), [1])
+
+        lazy = pickle.loads(pickle.dumps(BookMapper.author.callback))
+        self.assertEqual(lazy.targets, {})
+
+        shortcut = pickle.loads(pickle.dumps(Shortcut(BookMapper(excludes=["author"]), "items[]")))
+        self.assertEqual(shortcut({"items": [{"title": "x"}]}), [{"title": "x"}])
+
+    def test_map_parallel(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        dataset = [
+            {"name": "foo{}".format(i), "age": i, "books": [{"title": "x", "author": {"name": "foo", "age": 1}}]}
+            for i in range(50)
+        ]
+        mapper = AuthorMapper(many=True)
+        with ProcessPoolExecutor(2) as executor:
+            result = mapper.map_parallel(iter(dataset), executor=executor, chunksize=7)
+        self.assertEqual(result, mapper(dataset))
+        self.assertEqual(result[3], {"name": "foo3", "fullname": "foo33", "nbooks": 1})
+
+    def test_map_parallel__cache(self):
+        import pickle
+        from concurrent.futures import ProcessPoolExecutor
+        from dictremapper.cache import ResultCache
+
+        cache = ResultCache()
+        mapper = BookMapper(many=True, excludes=["author"], cache=cache)
+        self.assertIsNone(pickle.loads(pickle.dumps(mapper)).cache)
+        self.assertIs(mapper.cache, cache)
+
+        dataset = [{"title": "x{}".format(i)} for i in range(10)]
+        with ProcessPoolExecutor(2) as executor:
+            result = mapper.map_parallel(dataset, executor=executor, chunksize=3)
+        self.assertEqual(result, BookMapper(many=True, excludes=["author"])(dataset))
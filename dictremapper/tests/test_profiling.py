@@ -0,0 +1,77 @@
+# -*- coding:utf-8 -*-
+import unittest
+
+
+class Tests(unittest.TestCase):
+    def _makeOne(self):
+        from dictremapper.profiling import Profiler
+        return Profiler()
+
+    def _makeMapper(self, profiler):
+        from dictremapper import Remapper, Path, Self
+
+        class MyMapper(Remapper):
+            name = Path("name")
+            age = Path("age", default=0)
+            friends = Path("friends", callback=Self(many=True))
+
+        return MyMapper(profiler=profiler)
+
+    def test_it(self):
+        profiler = self._makeOne()
+        mapper = self._makeMapper(profiler)
+        d = {"name": "Steve", "age": 20, "friends": [{"name": "Mike", "friends": []}, {"name": "Joe", "friends": []}]}
+        result = mapper(d)
+        self.assertEqual(result["friends"][0], {"name": "Mike", "age": 0, "friends": []})
+
+        rows = {row["field"]: row for row in profiler.report()}
+        self.assertEqual(sorted(rows.keys()), ["age", "friends", "friends.age", "friends.friends", "friends.name", "name"])
+        self.assertEqual(rows["friends.name"]["calls"], 2)
+        self.assertEqual(rows["friends.name"]["depth"], 2)
+        self.assertEqual(rows["friends.age"]["defaults"], 2)
+        self.assertEqual(rows["age"]["defaults"], 0)
+        self.assertGreaterEqual(rows["friends"]["total"], rows["friends"]["self"])
+        self.assertEqual(rows["friends.name"]["stack"], "MyMapper.friends;MyMapper.name")
+
+    def test_missing(self):
+        profiler = self._makeOne()
+        mapper = self._makeMapper(profiler)
+        with self.assertRaises(KeyError):
+            mapper({"friends": []})
+        rows = {row["field"]: row for row in profiler.report()}
+        self.assertEqual(rows["name"]["errors"], 1)
+
+    def test_dump(self):
+        from io import StringIO
+
+        profiler = self._makeOne()
+        self._makeMapper(profiler)({"name": "Steve", "friends": [{"name": "Mike", "friends": []}]})
+
+        out = StringIO()
+        profiler.dump_folded(out)
+        lines = out.getvalue().splitlines()
+        self.assertIn("MyMapper.friends;MyMapper.name", [line.rsplit(" ", 1)[0] for line in lines])
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+        out = StringIO()
+        profiler.dump_report(out)
+        self.assertIn("friends.name", out.getvalue())
+
+    def test_disabled(self):
+        mapper = self._makeMapper(None)
+        self.assertIs(type(mapper.new_stack()), list)
+
+    def test_aggregate(self):
+        from dictremapper import Remapper, Path, Aggregate
+
+        class MyMapper(Remapper):
+            name = Path("name")
+            scores = Path("scores", tmpstate=True)
+            total = Aggregate(lambda d: sum(d["scores"]))
+
+        profiler = self._makeOne()
+        result = MyMapper(many=True, profiler=profiler)([{"name": "a", "scores": [1, 2]}, {"name": "b", "scores": []}])
+        self.assertEqual(result, [{"name": "a", "total": 3}, {"name": "b", "total": 0}])
+        rows = {row["field"]: row for row in profiler.report()}
+        self.assertEqual(rows["total"]["calls"], 2)
+        self.assertEqual(rows["total"]["stack"], "MyMapper.total")
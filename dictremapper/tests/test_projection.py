@@ -0,0 +1,112 @@
+# -*- coding:utf-8 -*-
+import unittest
+import json
+
+
+class Tests(unittest.TestCase):
+    def _getTargetClass(self):
+        from dictremapper import Remapper
+        return Remapper
+
+    def _getPath(self, *args, **kwargs):
+        from dictremapper import Path
+        return Path(*args, **kwargs)
+
+    def _makeMapper(self):
+        from dictremapper import Self, Composed
+
+        class PackageMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            version = self._getPath("meta.version", default=None)
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("full_name")
+            login = self._getPath("owner.login")
+            year = self._getPath("published_at.0", default=None)
+            tags = self._getPath("tags[].name", default=[])
+            packages = self._getPath("packages", callback=PackageMapper(many=True), default=[])
+            children = self._getPath("children", callback=Self(many=True), default=[])
+            license = self._getPath("license", default=None)
+            summary = Composed([self._getPath("full_name"), self._getPath("stars", default=0)],
+                               callback=lambda name, n: "{}:{}".format(name, n))
+        return MyMapper
+
+    def test_source_paths(self):
+        mapper = self._makeMapper()(excludes=["children", "packages.version"])
+        self.assertEqual(
+            mapper.source_paths(),
+            ["full_name", "license", "owner.login", "packages.name", "published_at.0", "stars", "tags.name"]
+        )
+
+    def test_loads(self):
+        from dictremapper.projection import loads
+
+        mapper = self._makeMapper()()
+        d = {
+            "full_name": "foo/bar", "description": "x" * 100, "escaped": "a\\\"]}[{",
+            "owner": {"login": "foo", "id": 1, "urls": [{"a": [1, 2, {"b": "]"}]}]},
+            "published_at": ["2000", {"unused": [1]}, "x"],
+            "tags": [{"name": "a", "id": 1}, {"name": "b", "id": 2}],
+            "packages": [{"name": "x", "meta": {"version": "1.0", "size": 10}}, {"name": "y"}],
+            "children": [{"full_name": "a/b", "owner": {"login": "a"}, "x": None, "children": [
+                {"full_name": "c/d", "owner": {"login": "c"}, "y": True}
+            ]}],
+            "license": {"key": "mit", "name": "MIT License"},
+            "stars": 10,
+            "unused": [True, False, None, -1.5e10, {}, []],
+        }
+        text = json.dumps(d, indent=2)
+        self.assertEqual(mapper.loads(text), mapper(json.loads(text)))
+        self.assertEqual(mapper.loads(text.encode("utf-8")), mapper(d))
+
+        projected = loads(json.dumps(d), mapper.get_projection())
+        self.assertNotIn("description", projected)
+        self.assertEqual(projected["owner"], {"login": "foo"})
+        self.assertEqual(projected["published_at"], ["2000", None, None])
+        self.assertEqual(projected["license"], d["license"])
+        self.assertEqual(projected["children"][0]["children"][0], {"full_name": "c/d", "owner": {"login": "c"}})
+
+        many = self._makeMapper()(many=True)
+        self.assertEqual(many.loads(json.dumps([d, d])), many([d, d]))
+
+    def test_whole(self):
+        from dictremapper import Aggregate
+
+        class CustomMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+            def as_dict(self, data, stack, excludes_dict):
+                d = super(CustomMapper, self).as_dict(data, stack, excludes_dict)
+                d["keys"] = sorted(data.keys())
+                return d
+
+        class MyMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            item = self._getPath("item", callback=CustomMapper())
+            items = self._getPath("items", callback=len)
+            first = self._getPath("name", tmpstate=True)
+            initial = Aggregate(lambda d: d["first"][0])
+
+        self.assertIsNone(CustomMapper().get_projection())
+        self.assertEqual(MyMapper().get_projection(), {"name": None, "item": None, "items": None})
+        d = {"name": "foo", "item": {"name": "x", "other": 1}, "items": [1, 2], "unused": 1}
+        self.assertEqual(MyMapper().loads(json.dumps(d)), MyMapper()(d))
+
+    def test_loads__many_digit_keys(self):
+        class Row(self._getTargetClass()):
+            name = self._getPath("0")
+            count = self._getPath("1")
+
+        text = '[["a", 1, "unused"], ["b", 2], ["c", 3]]'
+        self.assertEqual(Row().get_projection(), {"0": None, "1": None})
+        self.assertEqual(Row().loads(text), {"name": ["a", 1, "unused"], "count": ["b", 2]})
+        self.assertEqual(Row(many=True).loads(text), Row(many=True)(json.loads(text)))
+        self.assertEqual(list(Row(many="stream").loads(text)), Row(many=True)(json.loads(text)))
+
+    def test_invalid(self):
+        from dictremapper.projection import loads
+        from json.decoder import JSONDecodeError
+
+        for text in ['{"name": "x"', '{"name": "x", "unused": [1, 2}', '{"name": }', '{"name": "x"} 1', '']:
+            with self.assertRaises(JSONDecodeError):
+                loads(text, {"name": None})
@@ -0,0 +1,104 @@
+# -*- coding:utf-8 -*-
+import unittest
+import threading
+
+
+class Tests(unittest.TestCase):
+    def _makeMappers(self):
+        from dictremapper import Remapper, Path, Aggregate, LazyMapperCallable, Self
+
+        D = {}
+
+        class BookMapper(Remapper):
+            title = Path("title")
+            author = Path("author", callback=LazyMapperCallable("AuthorMapper", excludes=("books", ), loader=D.__getitem__))
+
+        class AuthorMapper(Remapper):
+            name = Path("name")
+            age = Path("age", default=0, callback=int)
+            books = Path("books", callback=LazyMapperCallable("BookMapper", many=True, excludes=("author", ), loader=D.__getitem__))
+            friends = Path("friends", callback=Self(many=True, excludes=("friends.books", )), default=[])
+            nbooks = Aggregate(lambda d: len(d["books"]))
+
+        D["BookMapper"] = BookMapper
+        D["AuthorMapper"] = AuthorMapper
+        return AuthorMapper
+
+    def _makeDataset(self, n):
+        return [
+            {
+                "name": "author{}".format(i), "age": str(i),
+                "books": [{"title": "book{}".format(j), "author": {}} for j in range(i % 5)],
+                "friends": [{"name": "friend{}".format(i), "books": [], "friends": []}],
+            }
+            for i in range(n)
+        ]
+
+    def test_concurrent_first_use(self):
+        from dictremapper import EMPTY
+
+        dataset = self._makeDataset(50)
+        nthreads = 8
+        for _ in range(5):
+            AuthorMapper = self._makeMappers()  # fresh classes, no caches yet
+            barrier = threading.Barrier(nthreads)
+            results = [None] * nthreads
+
+            def run(i):
+                barrier.wait()
+                results[i] = (AuthorMapper(many=True)(dataset), AuthorMapper.compile()(dataset[-1]))
+
+            threads = [threading.Thread(target=run, args=(i, )) for i in range(nthreads)]
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+
+            expected = AuthorMapper(many=True)(dataset)
+            for result, compiled in results:
+                self.assertEqual(result, expected)
+                self.assertEqual(compiled, expected[-1])
+            self.assertIs(AuthorMapper.compile(), AuthorMapper._compiled[EMPTY])
+
+    def test_counter(self):
+        from dictremapper import Counter
+
+        counter = Counter()
+        seen = []
+
+        def run():
+            seen.extend([counter() for _ in range(1000)])
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(sorted(seen), list(range(1, 8001)))
+
+    def test_map_threaded(self):
+        AuthorMapper = self._makeMappers()
+        dataset = self._makeDataset(200)
+        mapper = AuthorMapper(many=True)
+        self.assertEqual(mapper.map_threaded(iter(dataset), max_workers=4, chunksize=9), mapper(dataset))
+
+    def test_map_threaded__options(self):
+        from dictremapper.profiling import Profiler
+
+        AuthorMapper = self._makeMappers()
+        dataset = self._makeDataset(20)
+        dataset[3]["name"] = None
+        del dataset[5]["name"]
+
+        mapper = AuthorMapper(many=True, collect_errors=True)
+        result, errors = mapper.map_threaded(iter(dataset), max_workers=4, chunksize=3)
+        expected, expected_errors = mapper(dataset)
+        self.assertEqual(result, expected)
+        self.assertEqual([len(errs) for errs in errors], [len(errs) for errs in expected_errors])
+        self.assertEqual(len(errors[5]), 1)
+
+        mapper = AuthorMapper(many=True, iterative=True, memo=True)
+        self.assertEqual(mapper.map_threaded(iter(dataset[:5]), chunksize=2), AuthorMapper(many=True)(dataset[:5]))
+
+        with self.assertRaises(ValueError):
+            AuthorMapper(many=True, profiler=Profiler()).map_threaded(dataset)
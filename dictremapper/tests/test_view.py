@@ -0,0 +1,128 @@
+# -*- coding:utf-8 -*-
+import unittest
+
+
+class Tests(unittest.TestCase):
+    def _getTargetClass(self):
+        from dictremapper import Remapper
+        return Remapper
+
+    def _getPath(self, *args, **kwargs):
+        from dictremapper import Path
+        return Path(*args, **kwargs)
+
+    def _makeMapper(self, calls):
+        from dictremapper import Aggregate, Composed, Self
+
+        def counted(name, fn):
+            def callback(*args):
+                calls.append(name)
+                return fn(*args)
+            return callback
+
+        class ItemMapper(self._getTargetClass()):
+            name = self._getPath("name")
+            count = self._getPath("count", callback=counted("count", int))
+
+        class MyMapper(self._getTargetClass()):
+            status = self._getPath("status", callback=counted("status", str))
+            items = self._getPath("items", callback=ItemMapper(many=True), default=[])
+            main = self._getPath("main", callback=ItemMapper(excludes=["name"]))
+            children = self._getPath("children", callback=Self(many=True, excludes=["main"]), default=[])
+            title = Composed([self._getPath("status"), self._getPath("main.name")],
+                             callback=counted("title", lambda x, y: "{}:{}".format(x, y)))
+            first = self._getPath("status", tmpstate=True)
+            initial = Aggregate(counted("initial", lambda d: d["first"][0]))
+        return MyMapper
+
+    def test_it(self):
+        import json
+        from collections.abc import Mapping
+
+        calls = []
+        mapper = self._makeMapper(calls)()
+        d = {
+            "status": "open",
+            "items": [{"name": "x", "count": "1"}, {"name": "y", "count": "2"}],
+            "main": {"name": "z", "count": "3"},
+            "children": [{"status": "draft", "items": [], "main": {"name": "w", "count": "0"}}],
+        }
+        view = mapper.view(d)
+        self.assertIsInstance(view, Mapping)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(view["status"], "open")
+        self.assertEqual(view["status"], "open")
+        self.assertEqual(calls, ["status"])
+        self.assertEqual(view["items"][1]["count"], 2)
+        self.assertEqual(calls, ["status", "count", "count"])  # nested mappers are computed as a whole
+        self.assertEqual(view["items"], mapper(d)["items"])
+        del calls[:]
+        self.assertEqual(view["initial"], "o")  # with all fields, as the eager mode
+        self.assertEqual(calls.count("initial"), 2)  # and children's
+        self.assertEqual(calls.count("status"), 1)  # only children's, the memoized one is reused
+        n = len(calls)
+        self.assertEqual(view["initial"], "o")
+        self.assertEqual(len(calls), n)
+
+        expected = mapper(d)
+        self.assertEqual(list(view.keys()), list(expected.keys()))
+        self.assertNotIn("first", view)
+        self.assertEqual(view.to_dict(), expected)
+        self.assertEqual(type(view.to_dict()["children"][0]), type(expected["children"][0]))
+        self.assertEqual(dict(view), expected)
+        self.assertEqual(json.dumps(dict(view)), json.dumps(expected))
+        with self.assertRaises(TypeError):
+            view["status"] = "closed"
+
+    def test_missing(self):
+        from dictremapper import MissingKeyError
+
+        mapper = self._makeMapper([])(many=True)
+        views = mapper.view([{"status": "open"}])
+        self.assertEqual(views[0]["status"], "open")
+        with self.assertRaises(MissingKeyError) as c:
+            views[0]["main"]
+        self.assertEqual(c.exception.fields, ("main", ))
+
+    def test_aggregate(self):
+        import json
+        from dictremapper import Aggregate
+
+        class ItemMapper(self._getTargetClass()):
+            name = self._getPath("name")
+
+        class MyMapper(self._getTargetClass()):
+            a = self._getPath("a")
+            x = self._getPath("x", tmpstate=True)
+            items = self._getPath("items", callback=ItemMapper(many=True))
+            keys = Aggregate(lambda d: sorted(d.keys()))
+            total = Aggregate(lambda d: d["a"] + d["x"] + len(d["items"]) + len(d["keys"]))
+            names = Aggregate(lambda d: [item["name"] for item in d["items"]])
+
+        mapper = MyMapper()
+        d = {"a": 1, "x": 2, "items": [{"name": "i"}, {"name": "j"}]}
+        expected = mapper(d)
+        self.assertEqual(mapper.view(d)["keys"], ["a", "items", "x"])
+        view = mapper.view(d)
+        self.assertEqual(view["total"], expected["total"])
+        self.assertEqual(list(view.values()), list(expected.values()))
+        self.assertEqual(dict(view), expected)
+        self.assertEqual(type(dict(view)["items"][0]), type(expected["items"][0]))
+        self.assertEqual(json.dumps(dict(mapper.view(d))), json.dumps(expected))
+
+    def test_tmpstate(self):
+        from dictremapper import Aggregate
+
+        class MyMapper(self._getTargetClass()):
+            a = self._getPath("a")
+            b = self._getPath("b", tmpstate=True)
+            total = Aggregate(lambda d: d["a"] + d["b"])
+
+        view = MyMapper().view({"a": 1, "b": 2})
+        self.assertFalse("b" in view)
+        with self.assertRaises(KeyError):
+            view["b"]
+        self.assertIsNone(view.get("b"))
+        self.assertEqual(view["total"], 3)
+        self.assertEqual(dict(view), {"a": 1, "total": 3})
@@ -0,0 +1,91 @@
+# -*- coding:utf-8 -*-
+from collections.abc import Mapping
+from . import Frame
+from .compiler import is_plain_remapper
+
+_FIELD = 0
+_AGGREGATE = 1
+
+
+def get_spec(plan):
+    # (output names, {name: (kind, path, excludes)}), names of tmpstate fields are not in output names
+    spec = plan.__dict__.get("view_spec")
+    if spec is None:
+        fields = {}
+        for name, path, excludes in plan.fields:
+            fields[name] = (_FIELD, path, excludes)
+        for name, path in plan.aggregates:
+            fields[name] = (_AGGREGATE, path, None)
+        if plan.names is not None:
+            names = tuple(plan.names)
+        else:
+            names = tuple([name for name, _, _ in plan.fields] + [name for name, _ in plan.aggregates])
+        spec = plan.view_spec = (names, fields)
+    return spec
+
+
+def view(mapper, data, excludes_dict, frames=()):
+    if not is_plain_remapper(mapper.__class__):
+        return mapper.as_dict(data, list(frames), excludes_dict)
+    return RemappedView(mapper, data, excludes_dict, frames)
+
+
+class RemappedView(Mapping):
+    # read-only mapping, each field is computed at the first access. values are the same as the eager result
+    # (nested mappers are computed as a whole, when their field is accessed), so dict(view) is the eager result
+    __slots__ = ("_mapper", "_data", "_excludes", "_frames", "_plan", "_names", "_fields", "_values")
+
+    def __init__(self, mapper, data, excludes_dict, frames=()):
+        self._mapper = mapper
+        self._data = data
+        self._excludes = excludes_dict
+        self._frames = frames
+        self._plan = mapper.get_plan(excludes_dict)
+        self._names, self._fields = get_spec(self._plan)
+        self._values = {}
+
+    def __getitem__(self, name):
+        # tmpstate fields are computed only for aggregates, they are not a part of the view
+        if name not in self._names:
+            raise KeyError(name)
+        return self._get(name)
+
+    def _get(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        kind, path, excludes = self._fields[name]
+        if kind == _AGGREGATE:
+            self._aggregate()
+            return self._values[name]
+        stack = list(self._frames)
+        stack.append(Frame(name=name, remapper=self._mapper, excludes=excludes))
+        value = self._values[name] = path(self._data, stack)
+        return value
+
+    def _aggregate(self):
+        # aggregates see the same dict as the eager mode (all fields, including tmpstate ones)
+        d = self._mapper.dict()
+        for name, _, _ in self._plan.fields:
+            d[name] = self._get(name)
+        for name, path in self._plan.aggregates:
+            d[name] = path(d)
+        for name, _ in self._plan.aggregates:
+            self._values[name] = d[name]
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return "<{} of {} {!r}>".format(self.__class__.__name__, self._mapper.__class__.__name__, list(self._names))
+
+    def to_dict(self):
+        # same as the eager result
+        return self._mapper.dict([(name, self[name]) for name in self._names])
@@ -52,4 +52,6 @@ setup(name='dictremapper',
       tests_require=tests_require,
       test_suite="dictremapper.tests",
       entry_points="""
+      [console_scripts]
+      dictremapper = dictremapper.cli:main
 """)